@@ -1,8 +1,14 @@
+import time
 from langchain_huggingface import HuggingFaceEmbeddings
 from langgraph.graph import StateGraph, END, START
 from app.model.state import InterviewState
-from faster_whisper import WhisperModel
-GLOBAL_EMBEDDINGS_MODEL = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2", model_kwargs={'device': 'cuda'})
+from app.services.device import embeddings_model_kwargs
+from app.services.instrumentation import instrument_node
+from app.services.embedding_cache import EMBEDDING_CACHE
+from app.services.embedding_service import EmbeddingService
+GLOBAL_EMBEDDINGS_MODEL = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2", model_kwargs=embeddings_model_kwargs())
+# All embedding calls go through this: length-bucketed batches, persistent cache, float32 arrays out
+GLOBAL_EMBEDDING_SERVICE = EmbeddingService(GLOBAL_EMBEDDINGS_MODEL, cache=EMBEDDING_CACHE)
 # GLOBAL_FASTER_WHISPER_MODEL = WhisperModel(model_size_or_path="small", device="cuda", compute_type="int8")
 def build_graph():
     # ✅ Import node functions with proper aliases
@@ -20,16 +26,16 @@ def build_graph():
     # 1️⃣ Create a state graph
     graph = StateGraph(InterviewState)
 
-    # 2️⃣ Add nodes
-    graph.add_node("yt_audio_download_node", yt_audio_download_node)
-    graph.add_node("audio_transcribe_node", standard_transcribe_node)
-    graph.add_node("live_transcribe_node", live_transcribe_node)
-    graph.add_node("semantic_summarizer_node", semantic_summarizer_node)
-    graph.add_node("vector_db_store_node", vector_db_store_node)
-    graph.add_node("type_based_summary_node", type_based_summary_node)
-    graph.add_node("output_node", output_node)
-    graph.add_node("audio_analysis_node", audio_analysis_node)
-    graph.add_node("doubt_solving_node", doubt_solving_node)
+    # 2️⃣ Add nodes (wrapped to record per-node latency/resource metrics)
+    graph.add_node("yt_audio_download_node", instrument_node("yt_audio_download_node", yt_audio_download_node))
+    graph.add_node("audio_transcribe_node", instrument_node("audio_transcribe_node", standard_transcribe_node))
+    graph.add_node("live_transcribe_node", instrument_node("live_transcribe_node", live_transcribe_node))
+    graph.add_node("semantic_summarizer_node", instrument_node("semantic_summarizer_node", semantic_summarizer_node))
+    graph.add_node("vector_db_store_node", instrument_node("vector_db_store_node", vector_db_store_node))
+    graph.add_node("type_based_summary_node", instrument_node("type_based_summary_node", type_based_summary_node))
+    graph.add_node("output_node", instrument_node("output_node", output_node))
+    graph.add_node("audio_analysis_node", instrument_node("audio_analysis_node", audio_analysis_node))
+    graph.add_node("doubt_solving_node", instrument_node("doubt_solving_node", doubt_solving_node))
 
     # ✅ Conditional router at START
     def start_router(state: InterviewState) -> str:
@@ -65,3 +71,49 @@ def build_graph():
     graph.add_edge("doubt_solving_node", END)
 
     return graph.compile()
+
+
+# State fields published as partial results when the node that produces them finishes
+STREAMED_FIELDS = {
+    "yt_audio_download_node": ["video_id", "channel_and_title"],
+    "audio_transcribe_node": ["transcript"],
+    "live_transcribe_node": ["transcript"],
+    "audio_analysis_node": [],
+    "vector_db_store_node": ["file_key"],
+    "type_based_summary_node": ["final_summary", "qa"],
+    "output_node": [],
+    "doubt_solving_node": ["answer"],
+}
+
+
+def stream_graph(graph, state: InterviewState, on_event=None) -> dict:
+    """
+    Run the compiled graph with LangGraph's stream mode, calling
+    `on_event(node_name, elapsed_s, stage_s, data)` as each node finishes.
+    Returns the final state values, like `graph.invoke`.
+    """
+    start = last = time.time()
+    final_values = None
+
+    for mode, chunk in graph.stream(state, stream_mode=["updates", "values"]):
+        if mode == "values":
+            final_values = chunk
+            continue
+
+        for node_name, update in chunk.items():
+            now = time.time()
+            if hasattr(update, "model_dump"):
+                update = update.model_dump()
+            update = update or {}
+
+            data = {field: update.get(field) for field in STREAMED_FIELDS.get(node_name, []) if field in update}
+            if update.get("formatted_transcript_segments") is not None:
+                data["segment_count"] = len(update["formatted_transcript_segments"])
+            if update.get("error_message"):
+                data["error_message"] = update["error_message"]
+
+            if on_event is not None:
+                on_event(node_name, now - start, now - last, data)
+            last = now
+
+    return final_values
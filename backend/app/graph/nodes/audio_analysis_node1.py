@@ -20,8 +20,24 @@ import re
 
 import faiss
 
-from app.graph.graph import GLOBAL_EMBEDDINGS_MODEL
+from app.graph.graph import GLOBAL_EMBEDDING_SERVICE
 from app.model.state import InterviewState, ProcessedChunk
+from app.services.acoustic_features import compute_frame_features
+from app.services.audio_io import load_audio
+from app.services.pitch import estimate_pitch, PITCH_BACKEND
+from app.services.device import available_cpu_count
+from app.services.feature_store import feature_store_path, save_feature_store
+from app.services.shared_audio import SharedAudioBuffer, SharedAudioHandle
+
+# "frame": pitch/RMS/MFCC computed once per file and reduced per sentence
+# "sentence": legacy path, one librosa pass per sentence slice
+ACOUSTIC_FEATURE_MODE = os.getenv("ACOUSTIC_FEATURE_MODE", "frame").lower()
+# Rate/dtype the analysis works at; pitch tracking cost grows with the sample rate.
+# ANALYSIS_SAMPLE_RATE=0 keeps the file's native rate.
+ANALYSIS_SAMPLE_RATE = int(os.getenv("ANALYSIS_SAMPLE_RATE", "16000")) or None
+ANALYSIS_DTYPE = os.getenv("ANALYSIS_DTYPE", "float32")
+# Worker processes for acoustic analysis, 0 means one per available core
+ANALYSIS_N_JOBS = int(os.getenv("ANALYSIS_N_JOBS", "0")) or available_cpu_count()
 
 try:
     nltk.data.find('tokenizers/punkt')
@@ -32,6 +48,11 @@ try:
 except nltk.downloader.DownloadError:
     nltk.download('stopwords')
 
+def process_sentence_audio_shared(sent_info, handle: SharedAudioHandle, sr):
+    """Worker entry point: attach to the shared signal instead of receiving a pickled copy."""
+    return process_sentence_audio(sent_info, handle.open(), sr)
+
+
 def process_sentence_audio(sent_info, y, sr):
     start_time = sent_info['start']
     end_time = sent_info['end']
@@ -40,7 +61,7 @@ def process_sentence_audio(sent_info, y, sr):
 
     start_sample = int(start_time * sr)
     end_sample = int(end_time * sr)
-    sentence_audio = y[start_sample:end_sample]
+    sentence_audio = np.asarray(y[start_sample:end_sample])
 
     if len(sentence_audio) == 0:
         return {
@@ -63,11 +84,12 @@ def process_sentence_audio(sent_info, y, sr):
     duration_s = end_time - start_time
     rms_energy = librosa.feature.rms(y=sentence_audio).mean()
 
-    f0, voiced_flag, voiced_probs = librosa.pyin(
+    f0, voiced_flag = estimate_pitch(
         sentence_audio, 
+        sr,
+        PITCH_BACKEND,
         fmin=librosa.note_to_hz('C2'), 
-        fmax=librosa.note_to_hz('C5'), 
-        sr=sr
+        fmax=librosa.note_to_hz('C5')
     )
     mean_pitch = np.nanmean(f0[voiced_flag]) if np.any(voiced_flag) else 0
     pitch_std = np.nanstd(f0[voiced_flag]) if np.any(voiced_flag) else 0
@@ -97,6 +119,49 @@ def process_sentence_audio(sent_info, y, sr):
     }
 
 
+def frame_based_sentence_features(transcript_data, y, sr):
+    """
+    Same per-sentence features as `process_sentence_audio`, but from frame tracks
+    computed once over the whole file and reduced over each sentence's frame range.
+    """
+    frame_features = compute_frame_features(y, sr, n_jobs=ANALYSIS_N_JOBS)
+
+    starts = np.array([sent_info['start'] for sent_info in transcript_data], dtype=np.float64)
+    ends = np.array([sent_info['end'] for sent_info in transcript_data], dtype=np.float64)
+    stats = frame_features.range_stats(starts, ends)
+
+    # Loudness relative to the loudest frame of the episode
+    loudness_db = librosa.amplitude_to_db(
+        stats['rms_energy'] + np.finfo(float).eps,
+        ref=frame_features.peak_rms + np.finfo(float).eps
+    )
+
+    sentence_features = []
+    for i, sent_info in enumerate(transcript_data):
+        text = sent_info['text']
+        duration_s = ends[i] - starts[i]
+        word_count = len(word_tokenize(text))
+        empty = bool(stats['empty'][i])
+
+        sentence_features.append({
+            'sentence_text': text,
+            'duration_s': duration_s,
+            'word_count': word_count,
+            'mean_pitch': stats['mean_pitch'][i],
+            'rme_energy': stats['rms_energy'][i],
+            'speaking_rate': np.nan if empty else (word_count / duration_s if duration_s > 0 else 0),
+            'pause_before_s': np.nan,
+            'pause_after_s': np.nan,
+            'pitch_std': stats['pitch_std'][i],
+            'loudness_rms_db': np.nan if empty else loudness_db[i],
+            'mfccs_mean': stats['mfccs_mean'][i].tolist(),
+            'original_index': sent_info.get('original_index', None),
+            'start': sent_info['start'],
+            'end': sent_info['end']
+        })
+    return sentence_features
+
+
 def extract_audio_features(audio_path, transcript_data):
     print("inside extract")
     print(audio_path)
@@ -104,13 +169,18 @@ def extract_audio_features(audio_path, transcript_data):
         raise ValueError("Invalid audio path: None or empty string.")
 
     try:
-        y, sr = librosa.load(audio_path, sr=None)
+        y, sr = load_audio(audio_path, sr=ANALYSIS_SAMPLE_RATE, dtype=ANALYSIS_DTYPE)
     
         print("Loaded the file")
-        from joblib import Parallel, delayed
-        sentence_features = Parallel(n_jobs=6)(
-            delayed(process_sentence_audio)(sent_info, y, sr) for sent_info in transcript_data
-        )
+        if ACOUSTIC_FEATURE_MODE == "frame":
+            sentence_features = frame_based_sentence_features(transcript_data, y, sr)
+        else:
+            from joblib import Parallel, delayed
+            # Workers map the decoded signal from one shared float32 file and slice it by sample index
+            with SharedAudioBuffer(y) as handle:
+                sentence_features = Parallel(n_jobs=ANALYSIS_N_JOBS)(
+                    delayed(process_sentence_audio_shared)(sent_info, handle, sr) for sent_info in transcript_data
+                )
 
         # Calculate pause_before_s and pause_after_s
         for i in range(len(transcript_data)):
@@ -147,10 +217,11 @@ def calculate_text_importance(df):
     df['text_tfidf_similarity'] = sentence_doc_similarity
 
     print("Loading Sentence-BERT model")
-    model = GLOBAL_EMBEDDINGS_MODEL
+    model = GLOBAL_EMBEDDING_SERVICE
     
-    sentence_embeddings = model.embed_documents(sentences)
-    df['sentence_embedding'] = sentence_embeddings
+    # Kept as a float32 matrix (row i = sentence i) and handed to vector_db_store_node
+    # through the state instead of being stringified into the CSV
+    sentence_embeddings = model.embed(sentences)
 
     document_embedding = np.mean(sentence_embeddings, axis=0)
 
@@ -254,8 +325,6 @@ def generate_extractive_summary(df, summary_ratio):
     return summary_text
 
 def audio_analysis_node(state: InterviewState) -> InterviewState:
-    import time
-    start_1 = time.time()
     print("Starting podcast summarization process...")
 
     
@@ -278,6 +347,7 @@ def audio_analysis_node(state: InterviewState) -> InterviewState:
 
     # 4. Calculate Text Importance and get embedding model
     df_features, sbert_model, sentence_embeddings = calculate_text_importance(df_features)
+    state.sentence_embeddings = sentence_embeddings
     print("\n--- Calculated Text Importance ---")
     print(df_features[['sentence_text', 'text_tfidf_similarity', 'text_embedding_similarity', 'text_importance_score']].head())
 
@@ -303,15 +373,15 @@ def audio_analysis_node(state: InterviewState) -> InterviewState:
     else:
         audio_filename = os.path.basename(state.audio_file_path)# e.g., "interview_clip.mp3"
     name_without_ext = os.path.splitext(audio_filename)[0]     # e.g., "interview_clip"
-    csv_save_path = os.path.join("./csv", f"{name_without_ext}.csv")
+    store_path = feature_store_path(name_without_ext)
 
-    os.makedirs("./csv", exist_ok=True)  # Make sure the folder exists
-    df_final.to_csv(csv_save_path, index=False)
+    # Typed columns, fixed-width MFCC / embedding matrices, no float -> text round-trip
+    save_feature_store(df_final, store_path, embeddings=sentence_embeddings)
 
-    print(f"CSV saved to: {csv_save_path}")
+    print(f"Feature store saved to: {store_path}")
     
 
-    state.csv_path = csv_save_path
+    state.feature_store_path = store_path
     # # --- Original Extractive Summary (still useful for general overview) ---
     # print("\n--- Generating Extractive Summary (using salience scores) ---")
     # extractive_summary = generate_extractive_summary(df_final, 0.6)
@@ -321,6 +391,5 @@ def audio_analysis_node(state: InterviewState) -> InterviewState:
     
     # state.extractive_summary = extractive_summary
 
-    print(time.time() - start_1)
     return state
     
@@ -93,15 +93,35 @@
 
 import json
 import os
+import shutil
+import tempfile
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import ffmpeg
-import whisper_s2t  # <-- new import
 from app.model.state import InterviewState
+from app.services.audio_io import split_wav_at_silences, wav_duration_s
+from app.services.device import available_cpu_count, resolve_device, transcription_model_kwargs, TRANSCRIBE_DEVICE
+from app.services.transcript_cache import TRANSCRIPT_CACHE, audio_content_hash, transcript_cache_key
+from app.services.whisper_registry import get_whisper_model, WHISPER_BACKEND, WHISPER_MODEL_IDENTIFIER
 import uuid
 
+# --- Parallel transcription configuration ---
+# "auto": split long files across a process pool on CPU hosts, "on": always split, "off": never
+TRANSCRIBE_PARALLEL = os.getenv("TRANSCRIBE_PARALLEL", "auto").lower()
+# 0 means "half of the available cores", each worker then gets two CTranslate2 threads
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "0"))
+# Files shorter than this are transcribed in a single call in "auto" mode
+PARALLEL_MIN_DURATION_S = float(os.getenv("PARALLEL_MIN_DURATION_S", "600"))
+# Nominal window length and how far a cut may move to land in a silence
+PARALLEL_WINDOW_S = float(os.getenv("PARALLEL_WINDOW_S", "300"))
+PARALLEL_SEARCH_S = float(os.getenv("PARALLEL_SEARCH_S", "15"))
+# Also dump every fresh transcript to transcripts_json/ (never evicted; TRANSCRIPT_CACHE holds the real copy)
+TRANSCRIPT_DEBUG_JSON = os.getenv("TRANSCRIPT_DEBUG_JSON", "false").lower() in ("1", "true", "yes", "on")
 
-# CUDA setup for Windows
-os.environ["PATH"] = r"D:\My_Space\Podcast_Summarizer\cudnn\bin;" + os.environ["PATH"]
-os.add_dll_directory(r"D:\My_Space\Podcast_Summarizer\cudnn\bin")
+_TRANSCRIBE_POOL = None
+_TRANSCRIBE_POOL_LOCK = threading.Lock()
 
 
 def convert_to_wav(input_path: str) -> str:
@@ -114,14 +134,54 @@ def convert_to_wav(input_path: str) -> str:
     return output_path
 
 
-def transcribe_audio(file_path: str) -> str:
+def _transcription_workers() -> int:
+    if TRANSCRIBE_WORKERS > 0:
+        return TRANSCRIBE_WORKERS
+    return max(1, available_cpu_count() // 2)
 
-    model = whisper_s2t.load_model(
-        model_identifier="small",
-        backend="CTranslate2",
-        compute_type="int8",
-        device="cuda"  # Change to "cpu" if no GPU
-    )
+
+def _get_transcribe_pool(workers: int) -> ProcessPoolExecutor:
+    # Long-lived so every worker keeps its whisper model warm between requests
+    global _TRANSCRIBE_POOL
+    with _TRANSCRIBE_POOL_LOCK:
+        if _TRANSCRIBE_POOL is None:
+            _TRANSCRIBE_POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _TRANSCRIBE_POOL
+
+
+def _discard_transcribe_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool (e.g. a worker was OOM-killed) so the next call starts a fresh one."""
+    global _TRANSCRIBE_POOL
+    with _TRANSCRIBE_POOL_LOCK:
+        # Another job may already have replaced it
+        if _TRANSCRIBE_POOL is pool:
+            _TRANSCRIBE_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _transcribe_windows(windows: list, workers: int) -> list:
+    pool = _get_transcribe_pool(workers)
+    try:
+        futures = [
+            pool.submit(transcribe_segments, window_path, workers, offset_s)
+            for offset_s, window_path in windows
+        ]
+        formatted_segments = []
+        for future in futures:
+            formatted_segments.extend(future.result())
+        return formatted_segments
+    except BrokenProcessPool:
+        _discard_transcribe_pool(pool)
+        raise
+
+
+def transcribe_segments(file_path: str, workers: int = 1, offset_s: float = 0.0) -> list:
+    """Run whisper over a single file and return segments shifted by `offset_s` seconds."""
+    # Warm model shared across graph invocations (see app/services/whisper_registry.py)
+    model = get_whisper_model(workers=workers)
     # Prepare file list and parameters
     files = [f"{file_path}"]
     tasks = ["transcribe"]
@@ -139,23 +199,96 @@ def transcribe_audio(file_path: str) -> str:
     utterances = out[0]
 
     formatted_segments = []
-    full_text = ""
-
     for segment in utterances:
         formatted_segments.append({
-            "start": segment["start_time"],
-            "end": segment["end_time"],
+            "start": segment["start_time"] + offset_s,
+            "end": segment["end_time"] + offset_s,
             "text": segment["text"]
         })
+    return formatted_segments
+
+
+def _use_parallel(file_path: str, workers: int) -> bool:
+    if TRANSCRIBE_PARALLEL == "off" or workers < 2:
+        return False
+    if TRANSCRIBE_PARALLEL == "on":
+        return True
+    # On GPU a single batched call is already faster than several CPU processes
+    if resolve_device(TRANSCRIBE_DEVICE) != "cpu":
+        return False
+    return wav_duration_s(file_path) >= PARALLEL_MIN_DURATION_S
+
+
+def transcribe_segments_parallel(file_path: str, workers: int) -> list:
+    """
+    Split a 16 kHz WAV at silences and transcribe the windows across a process pool.
+    Segment timestamps are shifted back onto the timeline of the full file.
+    """
+    window_dir = tempfile.mkdtemp(prefix="transcribe_windows_")
+    try:
+        windows = split_wav_at_silences(file_path, window_dir, PARALLEL_WINDOW_S, PARALLEL_SEARCH_S)
+        print(f"Transcribing {len(windows)} windows across {workers} workers")
+
+        try:
+            return _transcribe_windows(windows, workers)
+        except BrokenProcessPool as e:
+            print(f"Transcription pool broke ({e}), retrying with a fresh pool")
+        try:
+            return _transcribe_windows(windows, workers)
+        except BrokenProcessPool as e:
+            print(f"Transcription pool broke again ({e}), transcribing in-process")
+        return transcribe_segments(file_path)
+    finally:
+        shutil.rmtree(window_dir, ignore_errors=True)
+
+
+def _transcription_config(parallel: bool) -> dict:
+    """Everything besides the audio itself that changes the transcript (part of the cache key)."""
+    model_kwargs = transcription_model_kwargs()
+    config = {
+        "model": WHISPER_MODEL_IDENTIFIER,
+        "backend": WHISPER_BACKEND,
+        "compute_type": model_kwargs["compute_type"],
+        "task": "transcribe",
+        "batch_size": 16,
+    }
+    if parallel:
+        config["window_s"] = PARALLEL_WINDOW_S
+        config["search_s"] = PARALLEL_SEARCH_S
+    return config
+
+
+def transcribe_audio(file_path: str) -> str:
+    workers = _transcription_workers()
+    parallel = _use_parallel(file_path, workers)
+    config = _transcription_config(parallel)
+    cache_key = transcript_cache_key(audio_content_hash(file_path), config)
+
+    cached = TRANSCRIPT_CACHE.get(cache_key)
+    if cached is not None:
+        print(f"Transcript cache hit: {cache_key}")
+        return cached
+
+    if parallel:
+        formatted_segments = transcribe_segments_parallel(file_path, workers)
+    else:
+        formatted_segments = transcribe_segments(file_path)
+
+    full_text = ""
+    for segment in formatted_segments:
         full_text += segment["text"].strip() + " "
+    full_text = full_text.strip()
 
-    os.makedirs("transcripts_json", exist_ok=True)
-    json_path = os.path.join("transcripts_json", "transcription_output.json")
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(formatted_segments, f, ensure_ascii=False, indent=2)
+    TRANSCRIPT_CACHE.put(cache_key, full_text, formatted_segments, config)
 
+    if TRANSCRIPT_DEBUG_JSON:
+        # One file per audio/config so concurrent requests don't overwrite each other
+        os.makedirs("transcripts_json", exist_ok=True)
+        json_path = os.path.join("transcripts_json", f"{cache_key}.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(formatted_segments, f, ensure_ascii=False, indent=2)
 
-    return full_text.strip(), formatted_segments
+    return full_text, formatted_segments
 
 
 def audio_transcribe_node(state: InterviewState) -> InterviewState:
@@ -1,14 +1,34 @@
 import os 
-from langchain_community.vectorstores import FAISS
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain.chains.combine_documents.stuff import create_stuff_documents_chain
 from langchain.prompts import ChatPromptTemplate
+from langchain_core.documents import Document
 from langchain_groq import ChatGroq
 from app.model.state import InterviewState
 from dotenv import load_dotenv
 load_dotenv()
 
-from app.graph.graph import GLOBAL_EMBEDDINGS_MODEL
+from app.graph.graph import GLOBAL_EMBEDDING_SERVICE
+from app.services.answer_cache import ANSWER_CACHE
+from app.services.episode_store import INDEX_FILE_NAME, SegmentDocstore, get_episode_store, get_lexical_index
+from app.services.global_index import GLOBAL_INDEX, GlobalIndexRetriever
+from app.services.hybrid_search import CONFIDENT_MIN_SIMILARITY, hybrid_search
+from app.services.lexical_index import tokenize
+from app.services.query_rewrite_cache import QUERY_REWRITE_CACHE
+
+QA_MODEL = "llama3-70b-8192"
+# off: search with the raw question; always: rewrite every question first;
+# auto: rewrite only when the raw question's retrieval isn't confident;
+# speculative: rewrite concurrently with retrieval on the raw question, keep the better result
+QUERY_REWRITE_MODE = os.getenv("QUERY_REWRITE_MODE", "auto").lower()
+# Questions with at most this many words, nearly all of them content words, are already search queries
+KEYWORD_QUERY_MAX_WORDS = 8
+# What the prompt tells the model to say when the context doesn't answer the question
+NO_INFORMATION_ANSWER = "I don't have that information"
+
+_REWRITE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-rewrite")
 
 def create_summary_qa_system(llm, retriever, content_type="summary"):
     """
@@ -16,7 +36,7 @@ def create_summary_qa_system(llm, retriever, content_type="summary"):
     
     Args:
         llm: Language model instance
-        retriever: FAISS retriever for semantic search
+        retriever: FAISS retriever for semantic search, or None to get only the answer chain
         content_type: Type of content (e.g., "summary", "article summary", "meeting notes")
     """
     
@@ -50,7 +70,7 @@ U can reframe the answer but mandatorily preseve facts and meaning extracted
 
 Provide a clear, helpful answer that directly addresses their question. Use relevant keywords from their question naturally. Start with the most important information first. Avoid casual openings like "So you want to know..." or "Well..." - instead jump straight into providing valuable information. Keep it focused and around 4-6 sentences.
 
-If the information isn't available, simply say "I don't have that information" and mention what related info is available."""
+If the information isn't available, simply say "{NO_INFORMATION_ANSWER}" and mention what related info is available."""
 
     prompt = ChatPromptTemplate.from_messages([
         ("system", system_prompt),
@@ -63,6 +83,10 @@ If the information isn't available, simply say "I don't have that information" a
         prompt=prompt
     )
     
+    if retriever is None:
+        # Caller retrieves the documents itself and invokes with {"context": docs, "input": ...}
+        return qa_chain
+
     # Create the retrieval chain
     retrieval_chain = create_retrieval_chain(
         retriever=retriever,
@@ -96,32 +120,168 @@ Optimized query:"""
     return optimized_query
 
 
-def doubt_solving_node(state: InterviewState) -> InterviewState:
+class Retrieval(NamedTuple):
+    documents: List[Document]
+    confident: bool
+    score: float  # best cosine similarity, -inf when not comparable
 
-    try:
 
+def search_channel(state: InterviewState) -> str:
+    """Channel searched by search_scope='channel': the given one, else the asked episode's."""
+    channel = state.channel
+    if channel is None and state.id:
+        episode = GLOBAL_INDEX.episode(state.id)
+        channel = episode["channel"] if episode else None
+    if channel is None:
+        raise ValueError("search_scope='channel' needs a channel or the id of an indexed episode")
+    return channel
+
+
+def retrieve(state: InterviewState, query: str, k: int = 30) -> Retrieval:
+    """
+    Documents for `query` in the requested scope, and whether the first pass is confident
+    enough to answer without rewriting the query.
+
+    Episode scope on a native store is hybrid (BM25 + vector, fused by reciprocal rank);
+    the global index and legacy stores are vector-only.
+    """
+    scope = (state.search_scope or "episode").lower()
+
+    if scope == "episode":
         folder_path = os.path.join("./faiss", state.id)
+        # Follow-up questions on the same episode reuse the already loaded store
+        vector_db = get_episode_store(folder_path, GLOBAL_EMBEDDING_SERVICE)
+        if isinstance(vector_db.docstore, SegmentDocstore):
+            result = hybrid_search(vector_db, get_lexical_index(folder_path), GLOBAL_EMBEDDING_SERVICE, query, k)
+            return Retrieval(result.documents, result.confident, result.top_similarity)
+        retriever = vector_db.as_retriever(search_type="similarity", search_kwargs={"k": k})
+        return Retrieval(retriever.invoke(query), False, float("-inf"))
 
-        vector_db = FAISS.load_local(folder_path, GLOBAL_EMBEDDINGS_MODEL, allow_dangerous_deserialization=True)
+    if scope == "channel":
+        retriever = GlobalIndexRetriever(embeddings=GLOBAL_EMBEDDING_SERVICE, k=k, channel=search_channel(state))
+    elif scope == "all":
+        retriever = GlobalIndexRetriever(embeddings=GLOBAL_EMBEDDING_SERVICE, k=k)
+    else:
+        raise ValueError(f"Unknown search_scope '{state.search_scope}'")
 
-        retriver = vector_db.as_retriever(search_type="similarity", search_kwargs={"k": 30})
+    documents = retriever.invoke(query)
+    score = documents[0].metadata.get("score", float("-inf")) if documents else float("-inf")
+    return Retrieval(documents, score >= CONFIDENT_MIN_SIMILARITY, score)
 
-        llm = ChatGroq(model="llama3-70b-8192", temperature=0.4)
 
-        
-        # Create the QA system
-        qa_system = create_summary_qa_system(llm, retriver)
-        
-        # Optimize the query for better retrieval
-        optimized_query = optimize_query_for_search(llm, state.question)
+def looks_like_search_query(question: str) -> bool:
+    """Short, keyword-dense questions gain nothing from an LLM rewrite."""
+    words = question.split()
+    return 0 < len(words) <= KEYWORD_QUERY_MAX_WORDS and len(tokenize(question)) >= len(words) - 1
+
+
+def rewrite_query(llm, question: str) -> str:
+    """`optimize_query_for_search` behind the question -> query cache."""
+    cached = QUERY_REWRITE_CACHE.get(QA_MODEL, question)
+    if cached is not None:
+        return cached
+    optimized_query = optimize_query_for_search(llm, question)
+    QUERY_REWRITE_CACHE.put(QA_MODEL, question, optimized_query)
+    return optimized_query
+
+
+def retrieve_for_question(state: InterviewState, llm) -> List[Document]:
+    """Retrieval for `state.question` following QUERY_REWRITE_MODE."""
+    question = state.question
+
+    if QUERY_REWRITE_MODE == "off":
+        return retrieve(state, question).documents
+
+    if QUERY_REWRITE_MODE == "always":
+        optimized_query = rewrite_query(llm, question)
         print(f"Optimized query: {optimized_query}")
-        
+        return retrieve(state, optimized_query).documents
+
+    if QUERY_REWRITE_MODE == "speculative":
+        rewrite = _REWRITE_POOL.submit(rewrite_query, llm, question)
+        raw = retrieve(state, question)
+        if raw.confident:
+            # The rewrite finishes in the background and lands in the cache for next time
+            print("Raw question retrieval confident, not waiting for the rewrite")
+            return raw.documents
+        try:
+            optimized_query = rewrite.result()
+        except Exception as e:
+            print(f"Query rewrite failed, using the raw question: {e}")
+            return raw.documents
+        print(f"Optimized query: {optimized_query}")
+        rewritten = retrieve(state, optimized_query)
+        return (rewritten if rewritten.score > raw.score else raw).documents
+
+    # auto
+    raw = retrieve(state, question)
+    if raw.confident or looks_like_search_query(question):
+        print("First-pass retrieval good enough, skipping query rewrite")
+        return raw.documents
+    optimized_query = rewrite_query(llm, question)
+    print(f"Optimized query: {optimized_query}")
+    return retrieve(state, optimized_query).documents
+
+
+def is_no_information_answer(answer: str) -> bool:
+    """The prompt's fallback, which says more about this retrieval than about the question."""
+    return NO_INFORMATION_ANSWER.lower() in answer.replace("\u2019", "'").lower()
+
+
+def answer_cache_scope(state: InterviewState) -> str:
+    """
+    Answer-cache scope for a question. Every scope carries a version of what it searches
+    (the episode store's build time, or the global index's episodes for the channel / for
+    all channels), so answers cached before new or re-processed episodes are never served.
+    """
+    scope = (state.search_scope or "episode").lower()
+    if scope == "episode":
+        built_at = int(os.path.getmtime(os.path.join("./faiss", state.id, INDEX_FILE_NAME)))
+        return f"episode:{state.id}@{built_at}"
+    if scope == "channel":
+        channel = search_channel(state)
+        return f"channel:{channel}@{GLOBAL_INDEX.version(channel)}"
+    return f"{scope}@{GLOBAL_INDEX.version()}"
+
+
+def doubt_solving_node(state: InterviewState) -> InterviewState:
+
+    try:
+
+        # Paraphrases of a question already answered for this episode are served from the cache
+        cache_scope = question_embedding = None
+        if ANSWER_CACHE is not None:
+            cache_scope = answer_cache_scope(state)
+            question_embedding = GLOBAL_EMBEDDING_SERVICE.embed_one(state.question)
+            cached = ANSWER_CACHE.get(cache_scope, question_embedding)
+            if cached is not None:
+                print(f"Answer cache hit (similarity {cached.similarity:.3f} to: {cached.question!r})")
+                state.answer = cached.answer
+                return state
+
+        llm = ChatGroq(model=QA_MODEL, temperature=0.4)
+
+        # Answer chain only; retrieval happens here so the query rewrite can be skipped or overlapped
+        qa_system = create_summary_qa_system(llm, None)
+
+        documents = retrieve_for_question(state, llm)
+
         # Get the response
-        response = qa_system.invoke({"input": optimized_query, "content_type": "summary"})
+        answer = qa_system.invoke({"context": documents, "input": state.question, "content_type": "summary"})
+        response = {"input": state.question, "context": documents, "answer": answer}
         
         print(response)
         state.answer =  response.get("answer") or "Sorry, I couldn't find an answer to your question."
 
+        # Fallback answers aren't cached, so later paraphrases get a fresh retrieval
+        cacheable = documents and response.get("answer") and not is_no_information_answer(response["answer"])
+        if ANSWER_CACHE is not None and cacheable:
+            context = [
+                {key: doc.metadata.get(key) for key in ("id", "file_key", "start", "end") if key in doc.metadata}
+                for doc in documents
+            ]
+            ANSWER_CACHE.put(cache_scope, state.question, question_embedding, state.answer, context)
+
 
         return state
     
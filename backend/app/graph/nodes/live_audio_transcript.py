@@ -1,20 +1,12 @@
-import whisper_s2t
 import json
 import os
 from app.model.state import InterviewState
-
-os.environ["PATH"] = r"D:\My_Space\Podcast_Summarizer\cudnn\bin;" + os.environ["PATH"]
-os.add_dll_directory(r"D:\My_Space\Podcast_Summarizer\cudnn\bin")
+from app.services.whisper_registry import get_whisper_model
 
 def transcribe_audio(file_path: str) -> str:
     print(file_path)
-    # Load the model once globally
-    model = whisper_s2t.load_model(
-        model_identifier="small",
-        backend="CTranslate2",
-        compute_type="int8",
-        device="cuda"  # Change to "cpu" if no GPU
-    )
+    # Shared with audio_transcribe_node, loaded once per process
+    model = get_whisper_model()
     # Prepare file list and parameters
     files = [f"{file_path}"]
     tasks = ["transcribe"]
@@ -45,7 +37,7 @@ def transcribe_audio(file_path: str) -> str:
 
     # Save to JSON (optional for debugging)
     os.makedirs("transcripts_json", exist_ok=True)
-    json_path = os.path.join("transcripts_json", "transcription_output.json")
+    json_path = os.path.join("transcripts_json", f"live_{os.path.splitext(os.path.basename(file_path))[0]}.json")
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(formatted_segments, f, ensure_ascii=False, indent=2)
 
@@ -32,11 +32,11 @@ logger = logging.getLogger(__name__)
 # --- Global HuggingFaceEmbeddings Embedder ---
 # Define the HuggingFaceEmbeddings globally to ensure consistency and single-time loading
 # This model_name MUST match the one used in GLOBAL_EMBEDDINGS_MODEL in vector_db_store_node
-from app.graph.graph import GLOBAL_EMBEDDINGS_MODEL
-GLOBAL_LANGCHAIN_EMBEDDER = GLOBAL_EMBEDDINGS_MODEL
+from app.graph.graph import GLOBAL_EMBEDDING_SERVICE
+GLOBAL_LANGCHAIN_EMBEDDER = GLOBAL_EMBEDDING_SERVICE
 
 
-# --- Core Functions (remain largely the same, but use GLOBAL_LANGCHAIN_EMBEDDER) ---
+# --- Core Functions (all embedding goes through GLOBAL_LANGCHAIN_EMBEDDER) ---
 
 def hybrid_chunk(text: str) -> List[Dict[str, Any]]:
     """Segment text by semantic shifts and approximate word count.
@@ -48,10 +48,10 @@ def hybrid_chunk(text: str) -> List[Dict[str, Any]]:
         return []
 
     logger.info(f"Tokenizing and encoding {len(sentences)} sentences for chunking stability.")
-    # Use the global LangChain embedder's embed_documents method
-    sentence_embeddings = GLOBAL_LANGCHAIN_EMBEDDER.embed_documents(sentences)
-    # Convert to numpy array for cosine_similarity if needed later, or ensure cosine_similarity handles lists
-    sentence_embeddings_np = np.array(sentence_embeddings)
+    sentence_embeddings_np = GLOBAL_LANGCHAIN_EMBEDDER.embed(sentences)
+    # Unit rows, so the similarity of neighbouring sentences is a row-wise dot product
+    norms = np.linalg.norm(sentence_embeddings_np, axis=1, keepdims=True)
+    unit_embeddings = sentence_embeddings_np / np.where(norms > 0, norms, 1.0)
 
 
     chunks_data: List[Dict[str, Any]] = []
@@ -66,22 +66,16 @@ def hybrid_chunk(text: str) -> List[Dict[str, Any]]:
 
         semantic_break = False
         if i + 1 < len(sentences):
-            # Use the numpy array version for cosine_similarity
-            curr_emb = sentence_embeddings_np[i]
-            next_emb = sentence_embeddings_np[i+1]
-            sim = cosine_similarity([curr_emb], [next_emb])[0][0]
+            sim = float(np.dot(unit_embeddings[i], unit_embeddings[i + 1]))
             semantic_break = sim < SEMANTIC_BREAK_THRESHOLD
         else:
             semantic_break = True # Force a break at the end of the text
 
         if current_len >= MIN_CHUNK_WORDS and (semantic_break or current_len >= MAX_CHUNK_WORDS):
             chunk_text = " ".join(current_chunk_sentences)
-            # Embed the full chunk using embed_query (for a single string)
-            chunk_embedding = GLOBAL_LANGCHAIN_EMBEDDER.embed_query(chunk_text)
             chunks_data.append({
                 "id": str(uuid.uuid4()), # Unique ID
                 "text": chunk_text,
-                "embedding": np.array(chunk_embedding), # Store as numpy array for consistency with other parts
                 "metadata": {"original_index": chunk_index} # Track original order
             })
             logger.debug(f"Chunk {chunk_index} created. Word count: {current_len}")
@@ -91,16 +85,18 @@ def hybrid_chunk(text: str) -> List[Dict[str, Any]]:
 
     if current_chunk_sentences: # Add any remaining sentences as a final chunk
         chunk_text = " ".join(current_chunk_sentences)
-        # Use the global embedder's embed_query method
-        chunk_embedding = GLOBAL_LANGCHAIN_EMBEDDER.embed_query(chunk_text)
         chunks_data.append({
             "id": str(uuid.uuid4()),
             "text": chunk_text,
-            "embedding": np.array(chunk_embedding), # Store as numpy array
             "metadata": {"original_index": chunk_index}
         })
         logger.debug(f"Final chunk {chunk_index} added. Word count: {current_len}")
 
+    # Embed all chunks in one batched call instead of one call per chunk
+    chunk_embeddings = GLOBAL_LANGCHAIN_EMBEDDER.embed([chunk["text"] for chunk in chunks_data])
+    for chunk, embedding in zip(chunks_data, chunk_embeddings):
+        chunk["embedding"] = embedding
+
     return chunks_data
 
 def score_importance(chunks_data: List[Dict[str, Any]], transcript_embedding: np.ndarray) -> np.ndarray:
@@ -173,8 +169,7 @@ def semantic_summarizer_node(state: InterviewState) -> InterviewState:
 
         # --- Step 2: Global Embedding and Importance Scoring ---
         logger.info("Encoding full transcript for global embedding.")
-        # Use the global LangChain embedder's embed_query method for the full transcript
-        global_transcript_embedding = np.array(GLOBAL_LANGCHAIN_EMBEDDER.embed_query(state.transcript))
+        global_transcript_embedding = GLOBAL_LANGCHAIN_EMBEDDER.embed_one(state.transcript)
 
         scores = score_importance(all_podcast_chunks_data, global_transcript_embedding)
         logger.info("Chunks scored for importance relative to the entire transcript.")
@@ -333,7 +333,6 @@
 #         return state
 
 import os
-from langchain_community.vectorstores import FAISS
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents.stuff import create_stuff_documents_chain
 from langchain.prompts import ChatPromptTemplate
@@ -350,7 +349,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Initialize the embeddings model globally or pass it in
 # This ensures consistency and avoids redundant loading
 # IT MUST MATCH THE MODEL USED TO CREATE THE FAISS INDEX
-from app.graph.graph import GLOBAL_EMBEDDINGS_MODEL
+from app.graph.graph import GLOBAL_EMBEDDING_SERVICE
+from app.services.episode_store import get_episode_store
 
 
 def type_based_summary_node(state: InterviewState) -> InterviewState:
@@ -368,7 +368,7 @@ def type_based_summary_node(state: InterviewState) -> InterviewState:
         return state
 
     try:
-        vector_db = FAISS.load_local(state.vector_db_path, GLOBAL_EMBEDDINGS_MODEL, allow_dangerous_deserialization=True)
+        vector_db = get_episode_store(state.vector_db_path, GLOBAL_EMBEDDING_SERVICE)
         
         num_segments = len(state.formatted_transcript_segments)
         k = max(30, int(0.6 * num_segments))  
@@ -285,22 +285,43 @@ import uuid
 import traceback
 import numpy as np
 import pandas as pd
-from langchain_core.documents import Document
-from langchain_community.docstore.in_memory import InMemoryDocstore
-from langchain_community.vectorstores.faiss import FAISS
-import faiss
+from app.services.episode_store import save_episode_store
+from app.services.global_index import GLOBAL_INDEX, GLOBAL_INDEX_ENABLED
+from app.services.vector_index import build_index
+from app.services.feature_store import EMBEDDINGS_COLUMN, load_feature_store
 from app.model.state import InterviewState
-from app.graph.graph import GLOBAL_EMBEDDINGS_MODEL  # Your global embedding model
+from app.graph.graph import GLOBAL_EMBEDDING_SERVICE  # Batched embedding service
+
+def _feature_rows(segments, feature_store):
+    """
+    Feature-store row for every segment (None when it has none), via a hash join:
+    on `original_index` when the store has it, otherwise on exact (start, end).
+    """
+    if "original_index" in feature_store:
+        row_by_key = {}
+        for row, index in enumerate(feature_store.column("original_index")):
+            if index == index:  # skip NaN
+                row_by_key.setdefault(int(index), row)
+        return [row_by_key.get(segment.get("original_index", i)) for i, segment in enumerate(segments)]
+
+    starts = feature_store.column("start")
+    ends = feature_store.column("end")
+    row_by_key = {}
+    for row in range(len(feature_store)):
+        row_by_key.setdefault((float(starts[row]), float(ends[row])), row)
+    return [row_by_key.get((segment.get("start"), segment.get("end"))) for segment in segments]
+
 
 def vector_db_store_node(state: InterviewState) -> InterviewState:
     """
-    Creates a FAISS vector database from transcript segments and their associated metadata.
-    Embeddings are stored without weighting or normalization.
+    Creates a FAISS vector database from transcript segments and their associated metadata,
+    saved in the native episode store format (services/episode_store.py).
+    Embeddings are stored without weighting; the index searches them by cosine similarity.
 
     Args:
         state (InterviewState): The current state object containing:
             - formatted_transcript_segments: A list of dictionaries with 'text', 'start', 'end'.
-            - csv_path: Path to metadata CSV.
+            - feature_store_path: Per-segment feature store written by audio_analysis_node.
             - source_type: "youtube" or "audio".
             - video_id or audio_file_path for file naming.
             - Output: vector_db_path or error_message.
@@ -312,66 +333,77 @@ def vector_db_store_node(state: InterviewState) -> InterviewState:
         print("Inside vector_db_store_node")
 
         segments = state.formatted_transcript_segments
-        csv_path = state.csv_path
+        store_path = state.feature_store_path
 
-        if not segments or not csv_path:
-            state.error_message = "Missing transcript segments or metadata CSV path."
+        if not segments or not store_path:
+            state.error_message = "Missing transcript segments or feature store path."
             return state
 
-        metadata_df = pd.read_csv(csv_path)
+        feature_store = load_feature_store(store_path)
 
-        if len(segments) != len(metadata_df):
-            state.error_message = f"Mismatch: {len(segments)} segments vs {len(metadata_df)} metadata rows"
+        if len(segments) != len(feature_store):
+            state.error_message = f"Mismatch: {len(segments)} segments vs {len(feature_store)} metadata rows"
             return state
 
-        embedding_model = GLOBAL_EMBEDDINGS_MODEL
-        print(f"Generating unweighted embeddings for {len(segments)} segments...")
+        durations = feature_store.column("duration_s")
+        saliences = feature_store.column("final_salience_score")
+        mean_pitches = feature_store.column("mean_pitch")
+        feature_rows = _feature_rows(segments, feature_store)
 
-        documents_for_docstore = {}
-        embeddings = []
-        index_to_docstore_id = {}
+        embedding_model = GLOBAL_EMBEDDING_SERVICE
 
-        for i, segment in enumerate(segments):
+        # Sentence embeddings computed by audio_analysis_node, one row per feature-store row
+        embedding_matrix = state.sentence_embeddings
+        if embedding_matrix is None and EMBEDDINGS_COLUMN in feature_store:
+            embedding_matrix = feature_store.column(EMBEDDINGS_COLUMN)
+        if embedding_matrix is not None and len(embedding_matrix) == len(segments):
+            print(f"Reusing analysis embeddings for {len(segments)} segments...")
+        else:
+            embedding_matrix = None
+            print(f"Generating unweighted embeddings for {len(segments)} segments...")
+
+        segment_rows = []
+        embedding_rows = []
+
+        for i, (segment, row) in enumerate(zip(segments, feature_rows)):
             text = segment["text"]
             start = segment.get("start")
             end = segment.get("end")
 
-            meta_row = metadata_df[(metadata_df["start"] == start) & (metadata_df["end"] == end)]
-            if meta_row.empty:
+            if row is None:
                 print(f"Skipping segment {i} due to missing metadata match.")
                 continue
 
-            meta = meta_row.iloc[0].to_dict()
-            salience = float(meta.get("final_salience_score", 0.5))  # Not used in embedding, only stored
+            salience = float(saliences[row])  # Not used in embedding, only stored
 
-            embedding = np.array(embedding_model.embed_query(text))  # No weighting or normalization
+            embedding_rows.append(row)
 
-            doc_id = str(uuid.uuid4())
-            metadata = {
-                "id": doc_id,
+            # Row j of the segment table is row j of the FAISS index
+            segment_rows.append({
+                "doc_id": str(uuid.uuid4()),
+                "text": text,
                 "start": start,
                 "end": end,
-                "duration_s": meta.get("duration_s"),
+                "duration_s": float(durations[row]),
                 "salience": salience,
-                "mean_pitch": meta.get("mean_pitch"),
+                "mean_pitch": float(mean_pitches[row]),
                 # Additional metadata fields can be added here
-            }
+            })
 
-            current_document = Document(page_content=text, metadata=metadata)
-            documents_for_docstore[doc_id] = current_document
-            embeddings.append(embedding)
-            index_to_docstore_id[i] = doc_id
-
-        if not documents_for_docstore:
+        if not segment_rows:
             state.error_message = "No valid document-embedding pairs created."
             return state
 
-        dim = len(embeddings[0])
-        index = faiss.IndexFlatL2(dim)
-        index.add(np.array(embeddings).astype("float32"))
+        if embedding_matrix is not None:
+            vectors = np.ascontiguousarray(embedding_matrix[embedding_rows], dtype=np.float32)
+        else:
+            # No weighting or normalization; one batched call for all kept segments
+            text_column = feature_store.column("sentence_text")
+            vectors = embedding_model.embed([text_column[row] for row in embedding_rows])
 
-        docstore = InMemoryDocstore(documents_for_docstore)
-        vector_db = FAISS(embedding_model.embed_query, index, docstore, index_to_docstore_id)
+        # Flat / HNSW / IVF-PQ over normalized vectors, chosen by VECTOR_INDEX_TYPE and size
+        index, index_meta = build_index(vectors)
+        print(f"Built {index_meta['index_type']} index over {index_meta['count']} vectors")
 
         save_dir = "./faiss"
         if state.source_type == "youtube":
@@ -383,7 +415,23 @@ def vector_db_store_node(state: InterviewState) -> InterviewState:
 
         save_path = os.path.join(save_dir, file_key)
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        vector_db.save_local(save_path)
+        # Index, mmap-able embeddings and a columnar segment table; no pickled docstore
+        save_episode_store(
+            save_path,
+            index,
+            index_meta,
+            vectors,
+            pd.DataFrame(segment_rows),
+            model_name=embedding_model.model_name,
+        )
+
+        if GLOBAL_INDEX_ENABLED:
+            # Also searchable across episodes; a failure here must not fail the episode itself
+            title, channel = (state.channel_and_title or [None, None])[:2]
+            try:
+                GLOBAL_INDEX.add_episode(file_key, vectors, segments=segment_rows, channel=channel, title=title)
+            except Exception as e:
+                print(f"Could not add {file_key} to the global index: {e}")
 
         state.file_key = file_key
         state.vector_db_path = save_path
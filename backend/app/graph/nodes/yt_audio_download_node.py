@@ -6,56 +6,95 @@ from app.model.state import InterviewState
 import os
 import re
 import subprocess
+import tempfile
 import yt_dlp
+from app.services.download_cache import DOWNLOAD_CACHE
+
+def extract_video_id(youtube_url: str) -> str:
+    match = re.search(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})", youtube_url)
+    if not match:
+        raise ValueError("Could not extract video ID from URL")
+    return match.group(1)
+
+
+def _stream_url_and_headers(info: dict) -> tuple:
+    """Direct media URL and HTTP headers of the format yt-dlp selected."""
+    if info.get("url"):
+        return info["url"], info.get("http_headers", {})
+    # Merged selections expose their parts separately; take the audio one
+    for fmt in info.get("requested_formats") or []:
+        if fmt.get("acodec") not in (None, "none") and fmt.get("url"):
+            return fmt["url"], fmt.get("http_headers", {})
+    raise ValueError("yt-dlp did not return a playable audio stream URL")
+
 
 def download_youtube_audio(youtube_url: str, output_dir: str = "temp_audio") -> tuple:
     os.makedirs(output_dir, exist_ok=True)
 
     # Extract video ID to create a clean file name
-    match = re.search(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})", youtube_url)
-    if not match:
-        raise ValueError("Could not extract video ID from URL")
-    video_id = match.group(1)
+    video_id = extract_video_id(youtube_url)
 
-    # Get video info using yt_dlp
+    cached = DOWNLOAD_CACHE.get(video_id)
+    if cached is None:
+        # Single-flight: a job that missed while another was downloading the same video
+        # waits for it and then finds the entry in the cache
+        with DOWNLOAD_CACHE.download_lock(video_id):
+            cached = DOWNLOAD_CACHE.get(video_id)
+            if cached is None:
+                cached = _download_to_cache(youtube_url, video_id, output_dir)
+                print(f"✅ Audio ready at: {cached.wav_path}")
+                return cached.wav_path, video_id, cached.title, cached.channel
+
+    print(f"✅ Audio cache hit for {video_id}: {cached.wav_path}")
+    return cached.wav_path, video_id, cached.title, cached.channel
+
+
+def _download_to_cache(youtube_url: str, video_id: str, output_dir: str):
+    """Stream one video's audio into a 16 kHz mono WAV and move it into DOWNLOAD_CACHE."""
+    # Resolve metadata and the best audio stream in a single extraction
     ydl_opts = {
         "quiet": True,
         "skip_download": True,
+        "noplaylist": True,
+        "format": "bestaudio/best",
     }
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(youtube_url, download=False)
         title = info.get("title", "unknown_title")
         channel = info.get("uploader", "unknown_channel")
+    stream_url, http_headers = _stream_url_and_headers(info)
 
-    # Paths
-    audio_path = os.path.join(output_dir, f"{video_id}.mp3")
-    wav_path = os.path.join(output_dir, f"{video_id}.wav")
-
-    # Step 1️⃣ Download as MP3
-    print("🎥 Downloading audio from YouTube...")
-    command_download = [
-        "yt-dlp", "-x", "--audio-format", "mp3",
-        "-o", audio_path,
-        youtube_url
-    ]
-    subprocess.run(command_download, check=True)
+    # Unique per download, so concurrent jobs never write or delete each other's file
+    fd, partial_path = tempfile.mkstemp(dir=output_dir, prefix=f"{video_id}-", suffix=".wav.part")
+    os.close(fd)
 
-    # Step 2️⃣ Convert to WAV (16kHz mono)
-    print("🎼 Converting to WAV (16kHz mono)...")
-    command_convert = [
-        "ffmpeg", "-i", audio_path,
-        "-ar", "16000",
+    # Decode the remote stream straight to 16kHz mono PCM: no intermediate MP3,
+    # no second yt-dlp resolution, and a single write of the final file.
+    print("🎥 Streaming audio from YouTube into WAV (16kHz mono)...")
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-y"]
+    if stream_url.startswith("http"):
+        command += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+    if http_headers:
+        command += ["-headers", "".join(f"{key}: {value}\r\n" for key, value in http_headers.items())]
+    command += [
+        "-i", stream_url,
+        "-vn",
         "-ac", "1",
-        wav_path
+        "-ar", "16000",
+        "-c:a", "pcm_s16le",
+        "-f", "wav",
+        partial_path,
     ]
-    subprocess.run(command_convert, check=True)
-
-    # Final check
-    if not os.path.exists(wav_path):
-        raise FileNotFoundError(f"WAV file not found at: {wav_path}")
-
-    print(f"✅ Audio ready at: {wav_path}")
-    return wav_path, video_id, title, channel
+    try:
+        subprocess.run(command, check=True)
+        if os.path.getsize(partial_path) == 0:
+            raise FileNotFoundError(f"ffmpeg produced no audio at: {partial_path}")
+        # Moves the finished file into the cache under its per-video name
+        cached = DOWNLOAD_CACHE.put(video_id, partial_path, title, channel)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return cached
 
 
 # LangGraph node function
@@ -1,16 +1,34 @@
 from fastapi import FastAPI, UploadFile, Form, File, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import json
 import shutil
 import os
+import uuid
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware 
 
-from app.graph.graph import build_graph
+from app.graph.graph import build_graph, stream_graph
 from app.model.state import InterviewState
+from app.services.answer_cache import ANSWER_CACHE
+from app.services.download_cache import DOWNLOAD_CACHE
+from app.services.embedding_cache import EMBEDDING_CACHE
+from app.services.global_index import GLOBAL_INDEX
+from app.services.instrumentation import METRICS
+from app.services.jobs import JOB_MANAGER, JobQueueFull, emit_job_event, FAILED, SUCCEEDED
+from app.services.query_rewrite_cache import QUERY_REWRITE_CACHE
+from app.services.transcript_cache import TRANSCRIPT_CACHE
+from app.services.vector_store_cache import VECTOR_STORE_CACHE
+from app.services.whisper_registry import WHISPER_MODEL_REGISTRY
 
 app = FastAPI(title="Podcast Summarizer API", description="Summarizes interview podcasts with Q&A and topics", version="1.0.0")
 graph = build_graph()
 
+# Seconds between SSE keep-alive comments while a job is between nodes
+SSE_KEEPALIVE_S = 15.0
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # You can restrict this to specific origins like ["http://localhost:3000"]
@@ -56,27 +74,69 @@ class YouTubeRequest(BaseModel):
     podcast_type: str
     summary_language: str
 
-@app.post("/summarize/youtube")
-async def summarize_youtube(request: YouTubeRequest, backgroundtask: BackgroundTasks):
+def publish_node_event(node: str, elapsed_s: float, stage_s: float, data: dict):
+    emit_job_event("node_completed", node=node, elapsed_s=elapsed_s, stage_s=stage_s, data=data)
+
+
+def run_summary_pipeline(state: InterviewState, cleanup_path: str = None) -> dict:
+    """Blocking pipeline run, executed on a JOB_MANAGER worker thread."""
     try:
-        state = InterviewState(
-            source_type="youtube",
-            source_link_or_path=request.youtube_link,
-            podcast_type=request.podcast_type,
-            summary_language=request.summary_language
-        )
-        
-        final_state = graph.invoke(state)
+        # Cached YouTube audio stays on disk until every node of this run has read it
+        with DOWNLOAD_CACHE.hold_pins():
+            final_state = stream_graph(graph, state, on_event=publish_node_event)
         final_state = InterviewState(**final_state)
-        
-        return JSONResponse(content={
+
+        return {
             "global_summary": final_state.final_summary,
             "rep": final_state.representative_sentences,
             "sum": final_state.global_summary,
             "qa": final_state.qa,
             "tra": final_state.transcript,
-            "id" : final_state.file_key
-        })
+            "id": final_state.file_key
+        }
+    finally:
+        # Remove temp upload after processing
+        if cleanup_path:
+            shutil.rmtree(os.path.dirname(cleanup_path), ignore_errors=True)
+
+
+def save_upload(file: UploadFile) -> str:
+    # One directory per upload so concurrent jobs with the same file name don't collide
+    upload_dir = os.path.join("temp_uploads", uuid.uuid4().hex)
+    os.makedirs(upload_dir, exist_ok=True)
+    temp_file_path = os.path.join(upload_dir, os.path.basename(file.filename))
+    with open(temp_file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return temp_file_path
+
+
+def youtube_state(request: YouTubeRequest) -> InterviewState:
+    return InterviewState(
+        source_type="youtube",
+        source_link_or_path=request.youtube_link,
+        podcast_type=request.podcast_type,
+        summary_language=request.summary_language
+    )
+
+
+def audio_state(temp_file_path: str, podcast_type: str, summary_language: str) -> InterviewState:
+    return InterviewState(
+        source_type="audio",
+        source_link_or_path=temp_file_path,
+        podcast_type=podcast_type,
+        summary_language=summary_language
+    )
+
+
+@app.post("/summarize/youtube")
+async def summarize_youtube(request: YouTubeRequest, backgroundtask: BackgroundTasks):
+    try:
+        job = JOB_MANAGER.submit("youtube", run_summary_pipeline, youtube_state(request))
+        # Wait without blocking the event loop, other clients keep being served
+        result = await asyncio.wrap_future(job.future)
+        return JSONResponse(content=result)
+    except JobQueueFull as e:
+        return JSONResponse(content={"error": f"Server busy: {e}"}, status_code=503)
     except Exception as e:
         print(e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -89,36 +149,122 @@ async def summarize_audio(
 ):
     try:
         # Save uploaded file locally
-        temp_file_path = f"temp_uploads/{file.filename}"
-        os.makedirs("temp_uploads", exist_ok=True)
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        temp_file_path = await run_in_threadpool(save_upload, file)
 
-        # Create InterviewState with additional form data
-        state = InterviewState(
-            source_type="audio",
-            source_link_or_path=temp_file_path,
-            podcast_type=podcast_type,              # <-- use as needed
-            summary_language=summary_language       # <-- use as needed
+        job = JOB_MANAGER.submit(
+            "audio", run_summary_pipeline,
+            audio_state(temp_file_path, podcast_type, summary_language), temp_file_path
         )
-
-        final_state = graph.invoke(state)
-        final_state = InterviewState(**final_state)
-
-        # Remove temp file after processing
-        os.remove(temp_file_path)
-
-        return JSONResponse(content={
-            "global_summary": final_state.final_summary,
-            "rep": final_state.representative_sentences,
-            "sum": final_state.global_summary,
-            "qa": final_state.qa,
-            "tra": final_state.transcript,
-            "id": final_state.file_key
-        })
+        result = await asyncio.wrap_future(job.future)
+        return JSONResponse(content=result)
+    except JobQueueFull as e:
+        shutil.rmtree(os.path.dirname(temp_file_path), ignore_errors=True)
+        return JSONResponse(content={"error": f"Server busy: {e}"}, status_code=503)
     except Exception as e:
         print(e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@app.post("/jobs/summarize/youtube", status_code=202)
+async def submit_youtube_job(request: YouTubeRequest):
+    try:
+        job = JOB_MANAGER.submit("youtube", run_summary_pipeline, youtube_state(request))
+    except JobQueueFull as e:
+        return JSONResponse(content={"error": f"Server busy: {e}"}, status_code=503)
+    return JSONResponse(content=job.to_dict(), status_code=202)
+
+
+@app.post("/jobs/summarize/audio", status_code=202)
+async def submit_audio_job(
+    file: UploadFile = File(...),
+    podcast_type: str = Form(...),
+    summary_language: str = Form(...)
+):
+    temp_file_path = await run_in_threadpool(save_upload, file)
+    try:
+        job = JOB_MANAGER.submit(
+            "audio", run_summary_pipeline,
+            audio_state(temp_file_path, podcast_type, summary_language), temp_file_path
+        )
+    except JobQueueFull as e:
+        shutil.rmtree(os.path.dirname(temp_file_path), ignore_errors=True)
+        return JSONResponse(content={"error": f"Server busy: {e}"}, status_code=503)
+    return JSONResponse(content=job.to_dict(), status_code=202)
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Unknown job id"}, status_code=404)
+    return JSONResponse(content=job.to_dict())
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Unknown job id"}, status_code=404)
+    if job.status == FAILED:
+        return JSONResponse(content={"error": job.error}, status_code=500)
+    if job.status != SUCCEEDED:
+        return JSONResponse(content=job.to_dict(), status_code=202)
+    return JSONResponse(content=job.result)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: one `node_completed` event per finished pipeline node, then `job_finished`."""
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Unknown job id"}, status_code=404)
+
+    async def event_stream():
+        seq = 0
+        while True:
+            events, finished = await job.next_events(seq, SSE_KEEPALIVE_S)
+            for event in events:
+                yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+            seq += len(events)
+            if finished and not events:
+                break
+            if not events:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/jobs/{job_id}/trace")
+async def job_trace(job_id: str):
+    """Per-node spans (wall time, process-wide CPU time and peak RSS, input sizes) recorded for one job."""
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Unknown job id"}, status_code=404)
+    return JSONResponse(content={"job_id": job.id, "status": job.status, "spans": job.trace})
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of pipeline, cache and job metrics."""
+    for name, stats in (
+        ("whisper_registry", WHISPER_MODEL_REGISTRY.stats()),
+        ("transcript_cache", TRANSCRIPT_CACHE.stats()),
+        ("download_cache", DOWNLOAD_CACHE.stats()),
+        ("embedding_cache", EMBEDDING_CACHE.stats() if EMBEDDING_CACHE is not None else {}),
+        ("vector_store_cache", VECTOR_STORE_CACHE.stats()),
+        ("query_rewrite_cache", QUERY_REWRITE_CACHE.stats()),
+        ("answer_cache", ANSWER_CACHE.stats() if ANSWER_CACHE is not None else {}),
+        ("jobs", JOB_MANAGER.stats()),
+    ):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                METRICS.set(f"{name}_{key}", value)
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/jobs")
+async def job_stats():
+    return JSONResponse(content=JOB_MANAGER.stats())
     
 from fastapi import UploadFile
 
@@ -135,7 +281,7 @@ async def transcribe_live(file: UploadFile, request):
             podcast_type=request.podcast_type,
             summary_language=request.summary_language
         )
-        final_state = graph.invoke(state)
+        final_state = await run_in_threadpool(graph.invoke, state)
         
         final_state = InterviewState(**final_state)
 
@@ -153,19 +299,67 @@ async def root():
     return {"message": "Podcast Summarizer API is running!"}
 
 
+@app.get("/models/whisper")
+async def whisper_model_stats():
+    return JSONResponse(content=WHISPER_MODEL_REGISTRY.stats())
+
+
+@app.get("/cache/transcripts")
+async def transcript_cache_stats():
+    return JSONResponse(content=TRANSCRIPT_CACHE.stats())
+
+
+@app.get("/cache/downloads")
+async def download_cache_stats():
+    return JSONResponse(content=DOWNLOAD_CACHE.stats())
+
+
+@app.get("/cache/vector-stores")
+async def vector_store_cache_stats():
+    return JSONResponse(content=VECTOR_STORE_CACHE.stats())
+
+
+@app.get("/cache/query-rewrites")
+async def query_rewrite_cache_stats():
+    return JSONResponse(content=QUERY_REWRITE_CACHE.stats())
+
+
+@app.get("/cache/answers")
+async def answer_cache_stats():
+    if ANSWER_CACHE is None:
+        return JSONResponse(content={"enabled": False})
+    return JSONResponse(content=ANSWER_CACHE.stats())
+
+
+@app.get("/index/global")
+async def global_index_stats():
+    return JSONResponse(content=GLOBAL_INDEX.stats())
+
+
+@app.get("/cache/embeddings")
+async def embedding_cache_stats():
+    if EMBEDDING_CACHE is None:
+        return JSONResponse(content={"enabled": False})
+    return JSONResponse(content=EMBEDDING_CACHE.stats())
+
+
 @app.post("/question")
 async def question(
     id: str = Form(...),
     question: str = Form(...),
+    scope: str = Form("episode"),
+    channel: Optional[str] = Form(None),
 ):
     try:
         state = InterviewState(
         id=id,
         question=question,
-        is_question=True
+        is_question=True,
+        search_scope=scope,
+        channel=channel
         )
 
-        final_state = graph.invoke(state)
+        final_state = await run_in_threadpool(graph.invoke, state)
 
         final_state = InterviewState(**final_state)
 
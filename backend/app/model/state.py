@@ -85,7 +85,9 @@ class InterviewState(BaseModel):
 
     wav_file_path: Optional[str] = None
 
-    csv_path: Optional[str] = None
+    feature_store_path: Optional[str] = None  # columnar per-segment features (see services/feature_store.py)
+
+    sentence_embeddings: Optional[Any] = None  # float32 array (n_segments, dim), row i = segment i
 
     is_question: Optional[bool] = False
 
@@ -93,6 +95,10 @@ class InterviewState(BaseModel):
 
     question: Optional[str] = None
 
+    search_scope: Optional[str] = "episode"  # "episode" (store of `id`), "channel" or "all" (global index)
+
+    channel: Optional[str] = None  # channel filter for search_scope="channel"; defaults to the channel of `id`
+
     file_key: Optional[str] = None
 
     answer: Optional[str] = None
@@ -0,0 +1,173 @@
+import logging
+import os
+from typing import Dict
+
+import librosa
+import numpy as np
+
+from app.services.pitch import estimate_pitch, PITCH_BACKEND
+from app.services.shared_audio import SharedAudioBuffer, SharedAudioHandle
+
+logger = logging.getLogger(__name__)
+
+# --- Frame analysis parameters (match librosa's defaults used by the per-sentence path) ---
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+N_MFCC = 13
+PITCH_FMIN = librosa.note_to_hz('C2')
+PITCH_FMAX = librosa.note_to_hz('C5')
+
+# Block length for pyin pitch tracking, and real-audio context added on each side
+PITCH_BLOCK_S = float(os.getenv("PITCH_BLOCK_S", "60"))
+BLOCK_MARGIN_FRAMES = 32
+
+
+def _prefix_sum(values: np.ndarray) -> np.ndarray:
+    """Cumulative sum along the last axis with a leading zero, in float64 for stable differences."""
+    values = np.asarray(values, dtype=np.float64)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    return np.pad(np.cumsum(values, axis=-1), pad)
+
+
+class FrameFeatures:
+    """
+    Whole-file frame tracks (f0, voiced flag, RMS, MFCC) with prefix sums, so the
+    mean / std of any time range is two lookups instead of a fresh STFT.
+    """
+
+    def __init__(self, f0: np.ndarray, voiced_flag: np.ndarray, rms: np.ndarray, mfcc: np.ndarray, sr: int, hop_length: int = HOP_LENGTH):
+        n_frames = min(len(f0), len(voiced_flag), len(rms), mfcc.shape[1])
+        self.sr = sr
+        self.hop_length = hop_length
+        self.n_frames = n_frames
+
+        f0 = f0[:n_frames]
+        voiced = np.asarray(voiced_flag[:n_frames], dtype=bool) & ~np.isnan(f0)
+        f0_voiced = np.where(voiced, f0, 0.0)
+
+        self.rms = rms[:n_frames]
+        self.peak_rms = float(self.rms.max()) if n_frames else 0.0
+        self._rms_cs = _prefix_sum(self.rms)
+        self._mfcc_cs = _prefix_sum(mfcc[:, :n_frames])
+        self._voiced_cs = _prefix_sum(voiced)
+        self._f0_cs = _prefix_sum(f0_voiced)
+        self._f0_sq_cs = _prefix_sum(f0_voiced * f0_voiced)
+
+    def frame_ranges(self, starts_s: np.ndarray, ends_s: np.ndarray):
+        """
+        Frame index ranges [a, b) whose centres fall inside each time range.
+        Non-empty ranges always cover at least one frame.
+        """
+        frames_per_s = self.sr / float(self.hop_length)
+        a = np.ceil(np.asarray(starts_s) * frames_per_s).astype(np.int64)
+        b = np.floor(np.asarray(ends_s) * frames_per_s).astype(np.int64) + 1
+        a = np.clip(a, 0, self.n_frames)
+        b = np.clip(np.maximum(b, a + 1), 0, self.n_frames)
+        return a, b
+
+    def range_stats(self, starts_s: np.ndarray, ends_s: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vectorised per-range statistics for all sentences at once.
+        Ranges that fall outside the audio get NaN (empty=True).
+        """
+        a, b = self.frame_ranges(starts_s, ends_s)
+        count = (b - a).astype(np.float64)
+        empty = count <= 0
+        safe_count = np.where(empty, 1.0, count)
+
+        rms_mean = (self._rms_cs[b] - self._rms_cs[a]) / safe_count
+        mfcc_mean = (self._mfcc_cs[:, b] - self._mfcc_cs[:, a]) / safe_count
+
+        voiced = self._voiced_cs[b] - self._voiced_cs[a]
+        safe_voiced = np.where(voiced > 0, voiced, 1.0)
+        f0_mean = (self._f0_cs[b] - self._f0_cs[a]) / safe_voiced
+        f0_sq_mean = (self._f0_sq_cs[b] - self._f0_sq_cs[a]) / safe_voiced
+        f0_std = np.sqrt(np.maximum(f0_sq_mean - f0_mean * f0_mean, 0.0))
+
+        # Same convention as the per-sentence path: 0 when no frame is voiced
+        f0_mean = np.where(voiced > 0, f0_mean, 0.0)
+        f0_std = np.where(voiced > 0, f0_std, 0.0)
+
+        rms_mean[empty] = np.nan
+        f0_mean[empty] = np.nan
+        f0_std[empty] = np.nan
+        mfcc_mean[:, empty] = np.nan
+
+        return {
+            "empty": empty,
+            "rms_energy": rms_mean,
+            "mean_pitch": f0_mean,
+            "pitch_std": f0_std,
+            "mfccs_mean": mfcc_mean.T,
+        }
+
+
+def _pitch(y: np.ndarray, sr: int, backend: str):
+    return estimate_pitch(
+        y,
+        sr,
+        backend,
+        frame_length=FRAME_LENGTH,
+        hop_length=HOP_LENGTH,
+        fmin=PITCH_FMIN,
+        fmax=PITCH_FMAX,
+    )
+
+
+def _pyin_frames(y: np.ndarray, sr: int, frame_start: int, frame_end: int):
+    """
+    pyin for global frames [frame_start, frame_end) of `y`. The slice carries
+    BLOCK_MARGIN_FRAMES of real audio on each side so frame padding and Viterbi decoding
+    at the block edges see the same context as a whole-file run; the margin frames are
+    dropped again.
+    """
+    lead = min(BLOCK_MARGIN_FRAMES, frame_start)
+    sample_start = (frame_start - lead) * HOP_LENGTH
+    sample_end = min(len(y), (frame_end + BLOCK_MARGIN_FRAMES) * HOP_LENGTH)
+    f0, voiced_flag = _pitch(np.asarray(y[sample_start:sample_end]), sr, "pyin")
+    keep = slice(lead, lead + (frame_end - frame_start))
+    return f0[keep], voiced_flag[keep]
+
+
+def _pyin_block(handle: SharedAudioHandle, sr: int, frame_start: int, frame_end: int):
+    """`_pyin_frames` in a worker, on a slice of the shared signal."""
+    return _pyin_frames(handle.open(), sr, frame_start, frame_end)
+
+
+def _blocked_pyin(y: np.ndarray, sr: int, n_jobs: int):
+    """
+    pyin in PITCH_BLOCK_S blocks, so its state-by-frame matrices stay block-sized even
+    for hour-long episodes. Blocks run across worker processes when n_jobs > 1 and one
+    after another in-process otherwise.
+    """
+    n_frames = 1 + len(y) // HOP_LENGTH
+    block_frames = max(1, int(PITCH_BLOCK_S * sr / HOP_LENGTH))
+    blocks = [(start, min(n_frames, start + block_frames)) for start in range(0, n_frames, block_frames)]
+
+    if n_jobs > 1:
+        from joblib import Parallel, delayed
+
+        with SharedAudioBuffer(y) as handle:
+            results = Parallel(n_jobs=n_jobs)(
+                delayed(_pyin_block)(handle, sr, start, end) for start, end in blocks
+            )
+    else:
+        results = [_pyin_frames(y, sr, start, end) for start, end in blocks]
+    f0 = np.concatenate([block_f0 for block_f0, _ in results])
+    voiced_flag = np.concatenate([block_voiced for _, block_voiced in results])
+    return f0, voiced_flag
+
+
+def compute_frame_features(y: np.ndarray, sr: int, n_jobs: int = 1, pitch_backend: str = PITCH_BACKEND) -> FrameFeatures:
+    """
+    Run RMS, pitch tracking and MFCC once over the whole signal. Long files are
+    pyin-tracked in blocks (across worker processes that share the signal through a
+    memory-mapped buffer when n_jobs > 1); the faster backends run in one call.
+    """
+    rms = librosa.feature.rms(y=y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH)[0]
+    if pitch_backend == "pyin" and len(y) > 2 * PITCH_BLOCK_S * sr:
+        f0, voiced_flag = _blocked_pyin(y, sr, n_jobs)
+    else:
+        f0, voiced_flag = _pitch(y, sr, pitch_backend)
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC, n_fft=FRAME_LENGTH, hop_length=HOP_LENGTH)
+    return FrameFeatures(f0, voiced_flag, rms, mfcc, sr, HOP_LENGTH)
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "on").lower() not in ("0", "off", "false", "no")
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join("answer_cache", "answers.sqlite3"))
+# Cosine similarity between question embeddings above which a cached answer is reused
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_PER_SCOPE = int(os.getenv("ANSWER_CACHE_MAX_PER_SCOPE", "500"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "50000"))
+# Scopes whose question embeddings are kept in memory (scopes are versioned, so old ones go cold)
+ANSWER_CACHE_LOADED_SCOPES = int(os.getenv("ANSWER_CACHE_LOADED_SCOPES", "64"))
+
+
+class CachedAnswer(NamedTuple):
+    answer: str
+    question: str
+    similarity: float
+    context: List[Dict[str, Any]]
+
+
+class AnswerCache:
+    """
+    Semantic answer cache: per scope (usually one episode's store), questions are matched
+    by cosine similarity of their embeddings, so paraphrases of an earlier question
+    reuse its answer. Each entry records the context segments the answer was built from.
+
+    Entries expire after `ttl_s`; each scope keeps at most `max_per_scope` entries and the
+    whole cache `max_entries`, evicting least-recently-used first. The question embeddings
+    of the `loaded_scopes` most recently used non-empty scopes are held in memory, so a
+    lookup is one matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        path: str = ANSWER_CACHE_PATH,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+        ttl_s: float = ANSWER_CACHE_TTL_S,
+        max_per_scope: int = ANSWER_CACHE_MAX_PER_SCOPE,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        loaded_scopes: int = ANSWER_CACHE_LOADED_SCOPES,
+    ):
+        self.path = path
+        self.similarity = similarity
+        self.ttl_s = ttl_s
+        self.max_per_scope = max(1, max_per_scope)
+        self.max_entries = max(1, max_entries)
+        self.loaded_scopes = max(1, loaded_scopes)
+        self._lock = threading.Lock()
+        self._conn = None
+        # scope -> (entry ids, unit question embeddings, created_at), least recently used first
+        self._scopes: "OrderedDict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " id INTEGER PRIMARY KEY,"
+                " scope TEXT NOT NULL,"
+                " question TEXT NOT NULL,"
+                " embedding BLOB NOT NULL,"
+                " answer TEXT NOT NULL,"
+                " context TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope)")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _scope_matrix(self, scope: str):
+        if scope in self._scopes:
+            self._scopes.move_to_end(scope)
+            return self._scopes[scope]
+
+        rows = self._connection().execute(
+            "SELECT id, embedding, created_at FROM answers WHERE scope = ?", (scope,)
+        ).fetchall()
+        ids = np.asarray([row[0] for row in rows], dtype=np.int64)
+        created = np.asarray([row[2] for row in rows], dtype=np.float64)
+        if not rows:
+            # Not kept: every new episode version would otherwise pin an empty entry
+            return ids, np.zeros((0, 0), dtype=np.float32), created
+
+        matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        self._scopes[scope] = (ids, matrix, created)
+        while len(self._scopes) > self.loaded_scopes:
+            self._scopes.popitem(last=False)
+        return self._scopes[scope]
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def get(self, scope: str, question_embedding: np.ndarray) -> Optional[CachedAnswer]:
+        query = self._unit(question_embedding)
+        now = time.time()
+        with self._lock:
+            ids, matrix, created = self._scope_matrix(scope)
+            if len(ids) == 0 or matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            similarities = matrix @ query
+            similarities[created < now - self.ttl_s] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity:
+                self.misses += 1
+                return None
+
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT question, answer, context FROM answers WHERE id = ?", (int(ids[best]),)
+            ).fetchone()
+            if row is None:
+                self._scopes.pop(scope, None)
+                self.misses += 1
+                return None
+            conn.execute("UPDATE answers SET last_access = ? WHERE id = ?", (now, int(ids[best])))
+            conn.commit()
+            self.hits += 1
+        return CachedAnswer(row[1], row[0], float(similarities[best]), json.loads(row[2]))
+
+    def put(self, scope: str, question: str, question_embedding: np.ndarray, answer: str, context: List[Dict[str, Any]]):
+        embedding = self._unit(question_embedding)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO answers (scope, question, embedding, answer, context, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scope, question, embedding.tobytes(), answer, json.dumps(context, default=float), now, now),
+            )
+            evicted = conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_s,)).rowcount
+            evicted += conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers WHERE scope = ?"
+                " ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (scope, self.max_per_scope),
+            ).rowcount
+            evicted += conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers"
+                " ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            conn.commit()
+            self.evictions += max(0, evicted)
+            # Other scopes may have lost entries to expiry / the global cap
+            if evicted:
+                self._scopes.clear()
+            else:
+                self._scopes.pop(scope, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "scopes_loaded": len(self._scopes),
+            }
+
+
+ANSWER_CACHE = AnswerCache() if ANSWER_CACHE_ENABLED else None
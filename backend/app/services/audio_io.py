@@ -0,0 +1,141 @@
+import os
+import subprocess
+import wave
+from typing import List, Tuple
+
+import numpy as np
+
+
+def read_wav_pcm16(path: str) -> Tuple[np.ndarray, int]:
+    """Read a mono 16-bit PCM WAV (as produced by our ffmpeg conversions) into an int16 array."""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit PCM WAV, got {8 * wf.getsampwidth()}-bit: {path}")
+        channels = wf.getnchannels()
+        sr = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sr
+
+
+def write_wav_pcm16(path: str, samples: np.ndarray, sr: int):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes(np.ascontiguousarray(samples, dtype="<i2").tobytes())
+
+
+def _wav_format(path: str):
+    """(sample_rate, channels, sample_width) of a WAV file, or None if it isn't plain PCM WAV."""
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def load_audio(path: str, sr: int, dtype: str = "float32") -> Tuple[np.ndarray, int]:
+    """
+    Decode any audio file to a mono signal at `sr` Hz (None keeps the native rate)
+    directly in `dtype`, without librosa's float64 resampling path.
+
+    16-bit WAVs already at the target rate are read with the stdlib; files soundfile
+    can read at the target rate are read natively; everything else is streamed
+    through ffmpeg, which resamples and emits float32 PCM on stdout.
+    """
+    wav_format = _wav_format(path)
+    if wav_format and wav_format[2] == 2 and (sr is None or wav_format[0] == sr):
+        samples, native_sr = read_wav_pcm16(path)
+        y = samples.astype(dtype) / np.asarray(32768.0, dtype=dtype)
+        return y, native_sr
+
+    try:
+        import soundfile as sf
+        info = sf.info(path)
+        if sr is None or info.samplerate == sr:
+            y, native_sr = sf.read(path, dtype="float32", always_2d=True)
+            return y.mean(axis=1).astype(dtype, copy=False), native_sr
+    except Exception:
+        # Not a container libsndfile understands (mp3/m4a/...), let ffmpeg handle it
+        pass
+
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path, "-vn", "-ac", "1"]
+    if sr is not None:
+        command += ["-ar", str(sr)]
+    command += ["-f", "f32le", "-acodec", "pcm_f32le", "-"]
+    result = subprocess.run(command, check=True, capture_output=True)
+    y = np.frombuffer(result.stdout, dtype="<f4").astype(dtype, copy=False)
+    if sr is None:
+        import soundfile as sf
+        sr = sf.info(path).samplerate
+    return y, sr
+
+
+def wav_duration_s(path: str) -> float:
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def find_silence_splits(
+    samples: np.ndarray,
+    sr: int,
+    window_s: float,
+    search_s: float,
+    frame_ms: float = 30.0,
+) -> List[int]:
+    """
+    Choose split points (in samples) roughly every `window_s` seconds.
+
+    Each split is moved to the quietest frame within +/- `search_s` of the nominal
+    boundary, using short-term RMS energy as a simple voice activity detector, so
+    windows are cut in pauses rather than in the middle of a word.
+    Returns the interior split points only (no 0 / len(samples)).
+    """
+    frame_len = max(1, int(sr * frame_ms / 1000))
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return []
+
+    frames = samples[: n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len)
+    energy = np.sqrt(np.mean(frames * frames, axis=1))
+
+    window_frames = int(window_s * 1000 / frame_ms)
+    search_frames = int(search_s * 1000 / frame_ms)
+    if window_frames <= 0 or n_frames <= window_frames:
+        return []
+
+    splits = []
+    last = 0
+    target = window_frames
+    while target < n_frames - search_frames:
+        lo = max(last + 1, target - search_frames)
+        hi = min(n_frames, target + search_frames + 1)
+        split_frame = lo + int(np.argmin(energy[lo:hi]))
+        splits.append(split_frame * frame_len + frame_len // 2)
+        last = split_frame
+        target = split_frame + window_frames
+    return splits
+
+
+def split_wav_at_silences(
+    path: str,
+    output_dir: str,
+    window_s: float,
+    search_s: float,
+) -> List[Tuple[float, str]]:
+    """
+    Split a 16 kHz mono WAV into windows cut at silences.
+    Returns (offset_seconds, window_path) pairs in playback order.
+    """
+    samples, sr = read_wav_pcm16(path)
+    boundaries = [0] + find_silence_splits(samples, sr, window_s, search_s) + [len(samples)]
+
+    os.makedirs(output_dir, exist_ok=True)
+    windows = []
+    for i, (start, end) in enumerate(zip(boundaries[:-1], boundaries[1:])):
+        window_path = os.path.join(output_dir, f"window_{i:04d}.wav")
+        write_wav_pcm16(window_path, samples[start:end], sr)
+        windows.append((start / float(sr), window_path))
+    return windows
@@ -0,0 +1,129 @@
+import logging
+import os
+import sys
+from functools import lru_cache
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# "auto" picks CUDA when it is usable and falls back to CPU otherwise.
+TRANSCRIBE_DEVICE = os.getenv("TRANSCRIBE_DEVICE", "auto")
+TRANSCRIBE_COMPUTE_TYPE = os.getenv("TRANSCRIBE_COMPUTE_TYPE", "auto")
+EMBEDDINGS_DEVICE = os.getenv("EMBEDDINGS_DEVICE", "auto")
+# 0 means "derive from the number of available cores"
+CPU_THREADS = int(os.getenv("CPU_THREADS", "0"))
+# Optional directory containing cuDNN/cuBLAS DLLs (Windows only)
+CUDNN_DLL_DIR = os.getenv("CUDNN_DLL_DIR")
+
+# CTranslate2 compute types that are fast on each kind of device
+DEFAULT_COMPUTE_TYPES = {
+    "cuda": "int8_float16",
+    "cpu": "int8",
+}
+
+
+def configure_cuda_dll_path():
+    """Register the cuDNN DLL directory on Windows when one is configured."""
+    if sys.platform != "win32" or not CUDNN_DLL_DIR:
+        return
+    if not os.path.isdir(CUDNN_DLL_DIR):
+        logger.warning(f"CUDNN_DLL_DIR does not exist: {CUDNN_DLL_DIR}")
+        return
+    os.environ["PATH"] = CUDNN_DLL_DIR + os.pathsep + os.environ.get("PATH", "")
+    os.add_dll_directory(CUDNN_DLL_DIR)
+
+
+# Must run before ctranslate2 / torch load their CUDA libraries
+configure_cuda_dll_path()
+
+
+@lru_cache(maxsize=1)
+def cuda_device_count() -> int:
+    """Number of CUDA devices visible to CTranslate2 (or torch as a fallback)."""
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count()
+    except Exception:
+        pass
+    try:
+        import torch
+        return torch.cuda.device_count() if torch.cuda.is_available() else 0
+    except Exception:
+        return 0
+
+
+def available_cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_device(requested: str = "auto") -> str:
+    """Map a requested device ("auto", "cuda", "cpu") to one that is actually usable."""
+    requested = (requested or "auto").lower()
+    if requested == "cpu":
+        return "cpu"
+    if cuda_device_count() > 0:
+        return "cuda"
+    if requested == "cuda":
+        logger.warning("CUDA requested but no CUDA device is available, falling back to CPU.")
+    return "cpu"
+
+
+def resolve_compute_type(device: str, requested: str = "auto") -> str:
+    requested = (requested or "auto").lower()
+    if requested != "auto":
+        # float16 kernels are not available on CPU in CTranslate2
+        if device == "cpu" and "float16" in requested:
+            logger.warning(f"compute_type={requested} is not supported on CPU, using int8.")
+            return "int8"
+        return requested
+    return DEFAULT_COMPUTE_TYPES[device]
+
+
+def cpu_thread_count(workers: int = 1) -> int:
+    """Intra-op threads per worker so that `workers` workers together fill the available cores."""
+    if CPU_THREADS > 0:
+        return CPU_THREADS
+    return max(1, available_cpu_count() // max(1, workers))
+
+
+def transcription_model_kwargs(workers: int = 1) -> Dict[str, Any]:
+    """
+    Keyword arguments for `get_whisper_model` selected for the current hardware.
+    On CPU-only hosts this is int8 CTranslate2 with one thread per available core.
+    """
+    device = resolve_device(TRANSCRIBE_DEVICE)
+    kwargs: Dict[str, Any] = {
+        "device": device,
+        "compute_type": resolve_compute_type(device, TRANSCRIBE_COMPUTE_TYPE),
+    }
+    if device == "cpu":
+        kwargs["cpu_threads"] = cpu_thread_count(workers)
+    return kwargs
+
+
+def embeddings_model_kwargs() -> Dict[str, Any]:
+    """`model_kwargs` for HuggingFaceEmbeddings, also tuning torch threads on CPU."""
+    device = (EMBEDDINGS_DEVICE or "auto").lower()
+    if device == "auto" or device.startswith("cuda"):
+        # sentence-transformers runs on torch, so torch decides whether CUDA is usable
+        try:
+            import torch
+            cuda_available = torch.cuda.is_available()
+        except ImportError:
+            cuda_available = False
+        if device == "auto":
+            device = "cuda" if cuda_available else "cpu"
+        elif not cuda_available:
+            logger.warning(f"EMBEDDINGS_DEVICE={device} requested but CUDA is not available, falling back to CPU.")
+            device = "cpu"
+    if device == "cpu":
+        try:
+            import torch
+            torch.set_num_threads(cpu_thread_count())
+        except ImportError:
+            pass
+    return {"device": device}
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import AbstractSet, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_json(path: str, payload: Any):
+    """Write JSON via a temp file + rename so readers never see a half-written entry."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def replace_directory(new_dir: str, directory: str):
+    """
+    Swap a fully written `new_dir` in for `directory`. The old directory is renamed aside
+    first and deleted after the swap, so `directory` is only missing between two renames
+    (never for a whole recursive delete), and a crash in between leaves the old copy at
+    `<directory>.old-*` instead of losing it.
+    """
+    old_dir = None
+    if os.path.isdir(directory):
+        old_dir = f"{directory}.old-{uuid.uuid4().hex}"
+        os.replace(directory, old_dir)
+    try:
+        os.replace(new_dir, directory)
+    except Exception:
+        if old_dir is not None:
+            os.replace(old_dir, directory)
+        raise
+    if old_dir is not None:
+        # Memory-mapped readers of the old files keep working; on Windows those files may stay behind
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def touch(path: str):
+    """Mark a cache entry as recently used (entries are evicted by oldest mtime)."""
+    now = time.time()
+    try:
+        os.utime(path, (now, now))
+    except FileNotFoundError:
+        pass
+
+
+def entry_size(path: str) -> int:
+    if os.path.isdir(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def remove_entry(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def enforce_size_limit(cache_dir: str, max_bytes: int, skip: AbstractSet[str] = frozenset()) -> List[str]:
+    """
+    Evict least-recently-used entries (files or directories directly under `cache_dir`)
+    until the cache fits in `max_bytes`. Entries named in `skip` (in use) are never
+    evicted, even if that leaves the cache over budget. Returns the names of evicted entries.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries: List[Tuple[float, int, str]] = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith(".tmp"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        size = entry_size(path)
+        entries.append((mtime, size, name))
+        total += size
+
+    evicted = []
+    for mtime, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name in skip:
+            continue
+        remove_entry(os.path.join(cache_dir, name))
+        total -= size
+        evicted.append(name)
+
+    if evicted:
+        logger.info(f"Evicted {len(evicted)} entries from {cache_dir}")
+    return evicted
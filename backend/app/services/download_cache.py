@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import wave
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional
+
+from app.services.disk_cache import atomic_write_json, enforce_size_limit, entry_size, remove_entry, touch
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", "audio_cache")
+DOWNLOAD_CACHE_MAX_MB = int(os.getenv("DOWNLOAD_CACHE_MAX_MB", "4096"))
+
+META_FILE_NAME = "meta.json"
+
+# Video IDs pinned by the pipeline run on this thread (see DownloadCache.hold_pins)
+_HELD_PINS: ContextVar[Optional[List[str]]] = ContextVar("download_cache_pins", default=None)
+
+
+def audio_file_name(video_id: str) -> str:
+    # Named after the video so everything keyed on the WAV's basename stays per-episode
+    return f"{video_id}.wav"
+
+
+class CachedAudio(NamedTuple):
+    wav_path: str
+    video_id: str
+    title: str
+    channel: str
+
+
+class DownloadCache:
+    """
+    Decoded YouTube audio keyed by video ID.
+
+    Each entry is a directory holding the 16 kHz mono WAV and a `meta.json` sidecar
+    (title, channel, file size, frame count). Entries are verified against the sidecar
+    on every hit and the whole cache is capped in size with LRU eviction.
+
+    Entries handed out inside `hold_pins()` are pinned until that block exits, so
+    eviction never deletes a WAV a running pipeline still has to read.
+    """
+
+    def __init__(self, cache_dir: str = DOWNLOAD_CACHE_DIR, max_mb: int = DOWNLOAD_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.corrupt = 0
+        self.evictions = 0
+        self._pins: Dict[str, int] = {}
+        # video_id -> [lock, holders + waiters] for single-flight downloads
+        self._download_locks: Dict[str, list] = {}
+
+    @contextmanager
+    def download_lock(self, video_id: str):
+        """
+        Serialize downloads of one video: the holder checks the cache again, downloads and
+        `put`s, so concurrent misses never fetch twice or move a file over a pinned entry.
+        """
+        with self._lock:
+            entry = self._download_locks.setdefault(video_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._download_locks[video_id]
+
+    @contextmanager
+    def hold_pins(self):
+        """Keep every entry returned by `get` / `put` inside this block safe from eviction until it exits."""
+        token = _HELD_PINS.set([])
+        try:
+            yield
+        finally:
+            held = _HELD_PINS.get()
+            _HELD_PINS.reset(token)
+            with self._lock:
+                for video_id in held:
+                    self._pins[video_id] -= 1
+                    if not self._pins[video_id]:
+                        del self._pins[video_id]
+
+    def _pin(self, video_id: str) -> bool:
+        # Caller holds self._lock
+        held = _HELD_PINS.get()
+        if held is None:
+            return False
+        held.append(video_id)
+        self._pins[video_id] = self._pins.get(video_id, 0) + 1
+        return True
+
+    def _unpin(self, video_id: str):
+        # Undo a `_pin` of this thread's block for an entry that turned out to be unusable
+        with self._lock:
+            held = _HELD_PINS.get()
+            if held is None or video_id not in held:
+                return
+            held.remove(video_id)
+            self._pins[video_id] -= 1
+            if not self._pins[video_id]:
+                del self._pins[video_id]
+
+    def _entry_dir(self, video_id: str) -> str:
+        return os.path.join(self.cache_dir, video_id)
+
+    def get(self, video_id: str) -> Optional[CachedAudio]:
+        entry_dir = self._entry_dir(video_id)
+        wav_path = os.path.join(entry_dir, audio_file_name(video_id))
+        meta_path = os.path.join(entry_dir, META_FILE_NAME)
+
+        # Pin before verifying so a concurrent `put` can't evict the entry in between
+        with self._lock:
+            self._pin(video_id)
+        if not os.path.exists(meta_path):
+            self._unpin(video_id)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._verify(wav_path, meta)
+        except (OSError, ValueError, KeyError, wave.Error, EOFError) as e:
+            logger.warning(f"Dropping corrupt download cache entry {video_id}: {e}")
+            self._unpin(video_id)
+            remove_entry(entry_dir)
+            with self._lock:
+                self.corrupt += 1
+                self.misses += 1
+            return None
+
+        touch(entry_dir)
+        with self._lock:
+            self.hits += 1
+        return CachedAudio(wav_path, video_id, meta["title"], meta["channel"])
+
+    def put(self, video_id: str, wav_source_path: str, title: str, channel: str) -> CachedAudio:
+        """Move a freshly decoded WAV into the cache and write its metadata sidecar."""
+        entry_dir = self._entry_dir(video_id)
+        os.makedirs(entry_dir, exist_ok=True)
+        wav_path = os.path.join(entry_dir, audio_file_name(video_id))
+        shutil.move(wav_source_path, wav_path)
+
+        with wave.open(wav_path, "rb") as wf:
+            frames = wf.getnframes()
+            sample_rate = wf.getframerate()
+
+        # The sidecar is written last, so an entry without one is never served
+        atomic_write_json(os.path.join(entry_dir, META_FILE_NAME), {
+            "video_id": video_id,
+            "title": title,
+            "channel": channel,
+            "size_bytes": os.path.getsize(wav_path),
+            "frames": frames,
+            "sample_rate": sample_rate,
+        })
+        touch(entry_dir)
+
+        with self._lock:
+            self._pin(video_id)
+            self.evictions += len(enforce_size_limit(self.cache_dir, self.max_bytes, skip=set(self._pins)))
+        return CachedAudio(wav_path, video_id, title, channel)
+
+    @staticmethod
+    def _verify(wav_path: str, meta: dict):
+        size = os.path.getsize(wav_path)
+        if size != meta["size_bytes"]:
+            raise ValueError(f"size {size} != {meta['size_bytes']}")
+        with wave.open(wav_path, "rb") as wf:
+            if wf.getnframes() != meta["frames"] or wf.getframerate() != meta["sample_rate"]:
+                raise ValueError("WAV header does not match metadata")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "corrupt": self.corrupt,
+                "evictions": self.evictions,
+                "pinned": len(self._pins),
+            }
+        stats["size_bytes"] = entry_size(self.cache_dir) if os.path.isdir(self.cache_dir) else 0
+        return stats
+
+
+DOWNLOAD_CACHE = DownloadCache()
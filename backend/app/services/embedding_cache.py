@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "on").lower() not in ("0", "off", "false", "no")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("embeddings_cache", "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+# When over the cap, evict down to this fraction of it so eviction doesn't run on every put
+_EVICT_TO_FRACTION = 0.9
+# Stay well below SQLite's bound-parameter limit
+_QUERY_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace; the tokenizer ignores it, so the embedding is unchanged."""
+    return " ".join(text.split())
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed embedding cache keyed by (model name, normalized text hash).
+
+    Vectors are stored as raw float32 blobs. Total vector bytes are capped at
+    `max_mb`, with least-recently-used rows evicted first. Shared across jobs and
+    processes via the database file (WAL mode, so readers don't block the writer).
+    The size is counted when the database is opened and then tracked incrementally,
+    so with several processes on one file it is approximate.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_mb: int = EMBEDDING_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = 0
+        self.size_bytes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " key BLOB NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " UNIQUE (model, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+            conn.commit()
+            self._conn = conn
+            self._refresh_size()
+        return self._conn
+
+    def _refresh_size(self):
+        # Full scan; only when the connection opens; puts and evictions adjust the totals
+        self.entries, self.size_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    def get_many(self, model: str, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached vectors for the given keys; missing keys are simply absent."""
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, dim, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for key, dim, vector in rows:
+                    found[bytes(key)] = np.frombuffer(vector, dtype=np.float32, count=dim)
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND key = ?",
+                    [(now, model, key) for key in found],
+                )
+                conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, items: List[Tuple[bytes, np.ndarray]]):
+        if not items:
+            return
+        now = time.time()
+        rows = {}
+        for key, vector in items:
+            vector = np.ascontiguousarray(vector, dtype=np.float32)
+            rows[key] = (model, key, int(vector.shape[0]), vector.tobytes(), now)
+        keys = list(rows)
+        with self._lock:
+            conn = self._connection()
+            # INSERT OR REPLACE only changes the totals by the rows it adds and the length difference
+            replaced_bytes = 0
+            replaced = 0
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                count, size = conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+                    f" WHERE model = ? AND key IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchone()
+                replaced += count
+                replaced_bytes += size
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, dim, vector, last_access) VALUES (?, ?, ?, ?, ?)",
+                list(rows.values()),
+            )
+            conn.commit()
+            self.entries += len(rows) - replaced
+            self.size_bytes += sum(len(row[3]) for row in rows.values()) - replaced_bytes
+            if self.size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        average = self.size_bytes / max(1, self.entries)
+        excess = self.size_bytes - self.max_bytes * _EVICT_TO_FRACTION
+        count = int(np.ceil(excess / max(1.0, average)))
+        victims = self._conn.execute(
+            "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT ?", (count,)
+        ).fetchall()
+        deleted = 0
+        for start in range(0, len(victims), _QUERY_CHUNK):
+            chunk = [rowid for rowid, _ in victims[start:start + _QUERY_CHUNK]]
+            deleted += self._conn.execute(
+                f"DELETE FROM embeddings WHERE rowid IN ({','.join('?' * len(chunk))})", chunk
+            ).rowcount
+        self._conn.commit()
+        self.evictions += deleted
+        self.entries = max(0, self.entries - deleted)
+        self.size_bytes = max(0, self.size_bytes - sum(length for _, length in victims))
+        logger.info(f"Evicted {deleted} embeddings from {self.path}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self.entries,
+                "size_mb": round(self.size_bytes / (1024 * 1024), 1),
+                "max_mb": self.max_bytes // (1024 * 1024),
+            }
+
+
+EMBEDDING_CACHE = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
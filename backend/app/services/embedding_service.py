@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.services.embedding_cache import EmbeddingCache, text_key
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+
+class EmbeddingService(Embeddings):
+    """
+    Central entry point for every embedding call in the pipeline.
+
+    Wraps a HuggingFaceEmbeddings instance and encodes in fixed-size batches of
+    inputs sorted by token length, so each batch is padded to roughly its own
+    longest sentence instead of the longest one in the episode. Results come back
+    as one contiguous float32 matrix in the caller's order.
+
+    Duplicate texts are embedded once per call, and with an `EmbeddingCache`
+    only texts never seen before (by this model) reach the encoder at all.
+
+    It is also a LangChain `Embeddings`, so FAISS stores can use it for query
+    embedding in place of the raw HuggingFaceEmbeddings object.
+    """
+
+    def __init__(self, embeddings, batch_size: int = EMBEDDING_BATCH_SIZE, cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.model_name = getattr(embeddings, "model_name", type(embeddings).__name__)
+        # The underlying SentenceTransformer, when available
+        self._client = getattr(embeddings, "_client", None)
+        self._encode_kwargs = dict(getattr(embeddings, "encode_kwargs", {}) or {})
+        self._encode_kwargs.pop("batch_size", None)
+        self._dimension = None
+        self.cache = cache
+        # Cache namespace: encode options such as normalize_embeddings change the vectors
+        self.cache_model = self.model_name
+        if self._encode_kwargs:
+            self.cache_model += json.dumps(self._encode_kwargs, sort_keys=True, default=str)
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            if self._client is not None and hasattr(self._client, "get_sentence_embedding_dimension"):
+                self._dimension = self._client.get_sentence_embedding_dimension()
+            else:
+                self._dimension = len(self.embeddings.embed_query("dimension probe"))
+        return self._dimension
+
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        tokenizer = getattr(self._client, "tokenizer", None)
+        if tokenizer is not None:
+            try:
+                encoded = tokenizer(texts, add_special_tokens=False, truncation=False)["input_ids"]
+                return np.fromiter((len(ids) for ids in encoded), dtype=np.int64, count=len(texts))
+            except Exception:
+                pass
+        return np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=len(texts))
+
+    def _encode_batch(self, batch: List[str]) -> np.ndarray:
+        if self._client is not None:
+            return self._client.encode(
+                batch,
+                batch_size=len(batch),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                **self._encode_kwargs,
+            )
+        return np.asarray(self.embeddings.embed_documents(batch), dtype=np.float32)
+
+    def _encode_bucketed(self, texts: List[str]) -> np.ndarray:
+        # Longest first: a too-large batch fails on the first call rather than the last
+        order = np.argsort(-self._token_lengths(texts), kind="stable")
+
+        output = None
+        for start in range(0, len(texts), self.batch_size):
+            batch_index = order[start:start + self.batch_size]
+            vectors = self._encode_batch([texts[i] for i in batch_index])
+            if output is None:
+                output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            output[batch_index] = vectors
+        return output
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` into a (len(texts), dim) float32 C-contiguous array."""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Same preprocessing as HuggingFaceEmbeddings, so vectors match its output
+        texts = [text.replace("\n", " ") for text in texts]
+        keys = [text_key(text) for text in texts]
+
+        # Row positions per distinct text, in first-seen order
+        positions: Dict[bytes, List[int]] = {}
+        for i, key in enumerate(keys):
+            positions.setdefault(key, []).append(i)
+
+        vectors: Dict[bytes, np.ndarray] = {}
+        if self.cache is not None:
+            vectors = self.cache.get_many(self.cache_model, list(positions))
+
+        missing = [key for key in positions if key not in vectors]
+        if missing:
+            encoded = self._encode_bucketed([texts[positions[key][0]] for key in missing])
+            new_vectors = list(zip(missing, encoded))
+            vectors.update(new_vectors)
+            if self.cache is not None:
+                self.cache.put_many(self.cache_model, new_vectors)
+
+        dim = len(next(iter(vectors.values())))
+        output = np.empty((len(texts), dim), dtype=np.float32)
+        for key, rows in positions.items():
+            output[rows] = vectors[key]
+        return output
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    # --- LangChain Embeddings interface ---
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_one(text).tolist()
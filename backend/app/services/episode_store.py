@@ -0,0 +1,177 @@
+"""
+Native on-disk format for an episode's vector store, replacing LangChain's
+`save_local` pickle of an InMemoryDocstore.
+
+    faiss/<file_key>/
+        store.json        format version, embedding model, row count
+        index_meta.json   index type / metric / params (see vector_index.py)
+        index.faiss       the FAISS index, row i = segment i
+        embeddings.npy    raw float32 segment embeddings (memory-mapped on load)
+        segments/         columnar segment table (see feature_store.py):
+                          doc_id, text, start, end, duration_s, salience, mean_pitch
+        bm25/             lexical index over the segment texts (see lexical_index.py)
+
+Loading reads the index and the manifests; segment text and metadata are
+memory-mapped and only turned into Documents for the rows a search returns.
+"""
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Union
+
+import faiss
+import numpy as np
+import pandas as pd
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app.services.disk_cache import replace_directory
+from app.services.feature_store import FeatureStore, save_feature_store
+from app.services.lexical_index import BM25Index
+from app.services.vector_index import configure_search, langchain_store_kwargs, load_index_meta, save_index_meta
+from app.services.vector_store_cache import VECTOR_STORE_CACHE
+
+logger = logging.getLogger(__name__)
+
+EPISODE_STORE_VERSION = 1
+STORE_MANIFEST_NAME = "store.json"
+INDEX_FILE_NAME = "index.faiss"
+EMBEDDINGS_FILE_NAME = "embeddings.npy"
+SEGMENTS_DIR_NAME = "segments"
+LEXICAL_DIR_NAME = "bm25"
+# Stores written by FAISS.save_local are pickles; loading one can execute arbitrary code
+ALLOW_LEGACY_PICKLE_STORES = os.getenv("ALLOW_LEGACY_PICKLE_STORES", "false").lower() in ("1", "true", "yes", "on")
+
+SEGMENT_METADATA_COLUMNS = ("start", "end", "duration_s", "salience", "mean_pitch")
+
+
+class SegmentDocstore(Docstore):
+    """Read-only docstore that builds Documents from the columnar segment table on demand."""
+
+    def __init__(self, segments: FeatureStore):
+        self.segments = segments
+        self._row_by_id: Optional[Dict[str, int]] = None
+
+    def row(self, doc_id: str) -> Optional[int]:
+        if self._row_by_id is None:
+            self._row_by_id = {doc_id: row for row, doc_id in enumerate(self.segments.column("doc_id"))}
+        return self._row_by_id.get(doc_id)
+
+    def document(self, row: int) -> Document:
+        doc_id = self.segments.column("doc_id")[row]
+        metadata = {"id": doc_id}
+        for name in SEGMENT_METADATA_COLUMNS:
+            if name in self.segments:
+                metadata[name] = float(self.segments.column(name)[row])
+        return Document(page_content=self.segments.column("text")[row], metadata=metadata)
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self.row(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self.document(row)
+
+
+class _RowDocIds(Mapping):
+    """index_to_docstore_id view over the doc_id column (FAISS row i -> doc id of segment i)."""
+
+    def __init__(self, segments: FeatureStore):
+        self.segments = segments
+
+    def __getitem__(self, row: int) -> str:
+        if not 0 <= row < len(self.segments):
+            raise KeyError(row)
+        return self.segments.column("doc_id")[row]
+
+    def __iter__(self):
+        return iter(range(len(self.segments)))
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+
+def save_episode_store(
+    directory: str,
+    index,
+    index_meta: Dict[str, Any],
+    embeddings: np.ndarray,
+    segments: pd.DataFrame,
+    model_name: str = "",
+) -> str:
+    """Write an episode store (layout in the module docstring) and swap it in for any existing one by rename."""
+    if len(segments) != index.ntotal or len(segments) != len(embeddings):
+        raise ValueError(f"Segment table ({len(segments)}), index ({index.ntotal}) and embeddings ({len(embeddings)}) disagree")
+
+    tmp_dir = f"{directory}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp_dir)
+    try:
+        faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE_NAME))
+        np.save(os.path.join(tmp_dir, EMBEDDINGS_FILE_NAME), np.ascontiguousarray(embeddings, dtype=np.float32))
+        save_feature_store(segments, os.path.join(tmp_dir, SEGMENTS_DIR_NAME))
+        BM25Index.build(segments["text"].tolist()).save(os.path.join(tmp_dir, LEXICAL_DIR_NAME))
+        save_index_meta(tmp_dir, index_meta)
+        with open(os.path.join(tmp_dir, STORE_MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": EPISODE_STORE_VERSION,
+                "model": model_name,
+                "count": len(segments),
+                "dim": int(embeddings.shape[1]),
+            }, f, indent=2)
+
+        replace_directory(tmp_dir, directory)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+def is_native_store(directory: str) -> bool:
+    return os.path.isfile(os.path.join(directory, STORE_MANIFEST_NAME))
+
+
+def load_episode_embeddings(directory: str) -> np.ndarray:
+    """Memory-mapped (count, dim) float32 embedding matrix of a native store."""
+    return np.load(os.path.join(directory, EMBEDDINGS_FILE_NAME), mmap_mode="r")
+
+
+def load_episode_store(directory: str, embeddings) -> FAISS:
+    """Load an episode's store with the metric and search settings it was built with."""
+    meta = load_index_meta(directory)
+
+    if not is_native_store(directory):
+        if not ALLOW_LEGACY_PICKLE_STORES:
+            raise ValueError(
+                f"{directory} is a legacy pickled store; re-process the episode "
+                "or set ALLOW_LEGACY_PICKLE_STORES=true to load it"
+            )
+        logger.warning(f"Loading legacy pickled vector store {directory}")
+        vector_db = FAISS.load_local(directory, embeddings, allow_dangerous_deserialization=True, **langchain_store_kwargs(meta))
+        configure_search(vector_db.index, meta)
+        return vector_db
+
+    with open(os.path.join(directory, STORE_MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != EPISODE_STORE_VERSION:
+        raise ValueError(f"Unsupported episode store version {manifest.get('version')} in {directory}")
+
+    index = faiss.read_index(os.path.join(directory, INDEX_FILE_NAME))
+    configure_search(index, meta)
+    segments = FeatureStore(os.path.join(directory, SEGMENTS_DIR_NAME))
+    return FAISS(embeddings, index, SegmentDocstore(segments), _RowDocIds(segments), **langchain_store_kwargs(meta))
+
+
+def get_episode_store(directory: str, embeddings) -> FAISS:
+    """`load_episode_store` through the process-wide LRU cache of loaded stores."""
+    return VECTOR_STORE_CACHE.get(directory, lambda path: load_episode_store(path, embeddings))
+
+
+def get_lexical_index(directory: str) -> Optional[BM25Index]:
+    """The store's BM25 index (cached like the store itself), or None for stores built without one."""
+    lexical_dir = os.path.join(directory, LEXICAL_DIR_NAME)
+    if not os.path.isdir(lexical_dir):
+        return None
+    return VECTOR_STORE_CACHE.get(lexical_dir, BM25Index.load)
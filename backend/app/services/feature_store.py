@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.disk_cache import replace_directory
+
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "features")
+FEATURE_STORE_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+EMBEDDINGS_COLUMN = "sentence_embeddings"
+
+
+def _is_vector_column(series: pd.Series) -> bool:
+    first = next((value for value in series if value is not None), None)
+    return isinstance(first, (list, tuple, np.ndarray))
+
+
+def _vector_matrix(series: pd.Series) -> np.ndarray:
+    """Stack a column of equal-length vectors into an (n, width) float32 matrix; missing rows become NaN."""
+    width = max((len(value) for value in series if isinstance(value, (list, tuple, np.ndarray))), default=0)
+    matrix = np.full((len(series), width), np.nan, dtype=np.float32)
+    for i, value in enumerate(series):
+        if isinstance(value, (list, tuple, np.ndarray)) and len(value) == width:
+            matrix[i] = value
+    return matrix
+
+
+def _write_text_column(directory: str, name: str, values: List[str]) -> Dict[str, str]:
+    """All strings in one UTF-8 blob plus an int64 offsets array (row i = blob[offsets[i]:offsets[i+1]])."""
+    encoded = [("" if value is None else str(value)).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    with open(os.path.join(directory, f"{name}.utf8"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+    return {"kind": "text", "file": f"{name}.utf8", "offsets": f"{name}.offsets.npy"}
+
+
+def save_feature_store(df: pd.DataFrame, directory: str, embeddings: Optional[np.ndarray] = None) -> str:
+    """
+    Write per-segment features as a columnar store: one .npy file per typed column,
+    fixed-width vector columns as 2-D float32 arrays, text columns as a UTF-8 blob
+    with offsets, and a manifest.json describing them. Any existing store at
+    `directory` is swapped out by rename (see `replace_directory`).
+    """
+    tmp_dir = f"{directory}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp_dir)
+    columns: Dict[str, Dict[str, str]] = {}
+
+    try:
+        for name in df.columns:
+            series = df[name]
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                values = series.to_numpy()
+                if values.dtype == object:
+                    values = values.astype(np.float64)
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+                columns[name] = {"kind": "scalar", "file": f"{name}.npy", "dtype": values.dtype.str}
+            elif _is_vector_column(series):
+                matrix = _vector_matrix(series)
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), matrix)
+                columns[name] = {"kind": "vector", "file": f"{name}.npy", "dtype": matrix.dtype.str}
+            else:
+                columns[name] = _write_text_column(tmp_dir, name, series.tolist())
+
+        if embeddings is not None:
+            matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+            np.save(os.path.join(tmp_dir, f"{EMBEDDINGS_COLUMN}.npy"), matrix)
+            columns[EMBEDDINGS_COLUMN] = {"kind": "vector", "file": f"{EMBEDDINGS_COLUMN}.npy", "dtype": matrix.dtype.str}
+
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump({"version": FEATURE_STORE_VERSION, "n_rows": len(df), "columns": columns}, f, indent=2)
+
+        replace_directory(tmp_dir, directory)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+class FeatureStore:
+    """
+    Read side of `save_feature_store`. Numeric and vector columns are memory-mapped
+    (zero-copy, loaded lazily); text columns are decoded on first access.
+    """
+
+    def __init__(self, directory: str, mmap: bool = True):
+        self.directory = directory
+        self.mmap_mode = "r" if mmap else None
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != FEATURE_STORE_VERSION:
+            raise ValueError(f"Unsupported feature store version {manifest.get('version')} in {directory}")
+        self.n_rows = manifest["n_rows"]
+        self.columns = manifest["columns"]
+        self._loaded: Dict[str, object] = {}
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def column(self, name: str):
+        """ndarray for scalar/vector columns, list of str for text columns."""
+        if name not in self._loaded:
+            spec = self.columns[name]
+            if spec["kind"] == "text":
+                with open(os.path.join(self.directory, spec["file"]), "rb") as f:
+                    blob = f.read()
+                offsets = np.load(os.path.join(self.directory, spec["offsets"]))
+                self._loaded[name] = [
+                    blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)
+                ]
+            else:
+                self._loaded[name] = np.load(os.path.join(self.directory, spec["file"]), mmap_mode=self.mmap_mode)
+        return self._loaded[name]
+
+    def scalars(self, names: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame of the requested scalar/text columns (all of them by default)."""
+        if names is None:
+            names = [name for name, spec in self.columns.items() if spec["kind"] != "vector"]
+        return pd.DataFrame({name: self.column(name) for name in names})
+
+
+def feature_store_path(name: str) -> str:
+    return os.path.join(FEATURE_STORE_DIR, name)
+
+
+def load_feature_store(directory: str, mmap: bool = True) -> FeatureStore:
+    return FeatureStore(directory, mmap=mmap)
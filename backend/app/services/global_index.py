@@ -0,0 +1,498 @@
+"""
+Cross-episode search index over every processed episode.
+
+    global_index/
+        catalog.sqlite3       episodes (file_key, channel, title, shard) and
+                              segments (global vector id -> file_key, row in the episode store,
+                              shard, doc id, text, start, end)
+        shards/shard_0000.faiss, ...
+                              IndexIDMap2 over flat / HNSW inner-product indexes
+
+Shards are immutable once written. Each episode is written as its own small shard, and
+size-tiered compaction merges GLOBAL_SHARD_MERGE_FACTOR shards of a similar size into one
+(up to GLOBAL_SHARD_MAX_VECTORS) off the search lock, so adding an episode never rewrites
+a large shard and the number of shards searched stays logarithmic. Per-episode and
+per-channel filters become an IDSelectorBatch over the matching vector ids, so a filtered
+search is still one ANN query per shard; filters too narrow for HNSW to find their
+vectors are scored exactly instead. Hits are resolved to text from the catalog
+alone, without opening the episodes' stores.
+
+Re-processing an episode drops its old ids from the catalog; stale vectors left in a
+shard are filtered out of the results and dropped at the next compaction.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.services.vector_index import HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, HNSW_M, HNSW_MIN_VECTORS
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+GLOBAL_INDEX_ENABLED = os.getenv("GLOBAL_INDEX", "on").lower() not in ("0", "off", "false", "no")
+GLOBAL_INDEX_DIR = os.getenv("GLOBAL_INDEX_DIR", "global_index")
+# Compaction never grows a shard beyond this many vectors
+GLOBAL_SHARD_MAX_VECTORS = int(os.getenv("GLOBAL_SHARD_MAX_VECTORS", "500000"))
+# Shards of a similar size are merged once this many of them exist
+GLOBAL_SHARD_MERGE_FACTOR = int(os.getenv("GLOBAL_SHARD_MERGE_FACTOR", "8"))
+# hnsw | flat; "hnsw" still keeps shards below HNSW_MIN_VECTORS flat
+GLOBAL_INDEX_TYPE = os.getenv("GLOBAL_INDEX_TYPE", "hnsw").lower()
+
+# Filters selecting at most this share of an HNSW shard are scored exactly instead
+GLOBAL_FILTER_EXACT_FRACTION = float(os.getenv("GLOBAL_FILTER_EXACT_FRACTION", "0.02"))
+
+# Extra candidates fetched per shard to make up for stale (re-processed) vectors
+_STALE_OVERFETCH = 2
+# Catalog columns added after the first release of the index
+_SEGMENT_TEXT_COLUMNS = (("doc_id", "TEXT"), ("text", "TEXT"), ("start_s", "REAL"), ("end_s", "REAL"))
+
+
+class GlobalHit(NamedTuple):
+    score: float
+    vector_id: int
+    file_key: str
+    row: int
+    channel: Optional[str]
+    title: Optional[str]
+    # None for segments cataloged before the text was stored there
+    doc_id: Optional[str]
+    text: Optional[str]
+    start: Optional[float]
+    end: Optional[float]
+
+
+def _optional_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class GlobalIndex:
+    def __init__(
+        self,
+        directory: str = GLOBAL_INDEX_DIR,
+        shard_max_vectors: int = GLOBAL_SHARD_MAX_VECTORS,
+        merge_factor: int = GLOBAL_SHARD_MERGE_FACTOR,
+    ):
+        self.directory = directory
+        self.shard_max_vectors = max(1, shard_max_vectors)
+        self.merge_factor = max(2, merge_factor)
+        # Guards the catalog connection and the loaded-shard map; never held while
+        # building, writing or searching a shard
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._conn = None
+        self._shards: Dict[int, Any] = {}
+        self.compactions = 0
+
+    # --- storage ---
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.join(self.directory, "shards"), exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, "catalog.sqlite3"), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS episodes ("
+                " file_key TEXT PRIMARY KEY, channel TEXT, title TEXT,"
+                " shard INTEGER NOT NULL, n_segments INTEGER NOT NULL, added_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " id INTEGER PRIMARY KEY, file_key TEXT NOT NULL, row INTEGER NOT NULL, shard INTEGER NOT NULL,"
+                " doc_id TEXT, text TEXT, start_s REAL, end_s REAL)"
+            )
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(segments)")}
+            for name, sql_type in _SEGMENT_TEXT_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE segments ADD COLUMN {name} {sql_type}")
+            # Vector and shard ids are never reused, even after an episode's rows are replaced
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS segments_file_key ON segments (file_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS segments_shard ON segments (shard)")
+            conn.execute("CREATE INDEX IF NOT EXISTS episodes_channel ON episodes (channel)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.directory, "shards", f"shard_{shard:04d}.faiss")
+
+    def _shard(self, shard: int):
+        if shard not in self._shards:
+            path = self._shard_path(shard)
+            if not os.path.exists(path):
+                return None
+            index = faiss.read_index(path)
+            base = faiss.downcast_index(index.index)
+            if hasattr(base, "hnsw"):
+                base.hnsw.efSearch = HNSW_EF_SEARCH
+            self._shards[shard] = index
+        return self._shards[shard]
+
+    def _drop_shard(self, shard: int):
+        self._shards.pop(shard, None)
+        try:
+            os.remove(self._shard_path(shard))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _build_shard(vectors: np.ndarray, ids: np.ndarray):
+        """An IndexIDMap2 over `vectors` (already L2-normalized); flat while it is small."""
+        n, dim = vectors.shape
+        if GLOBAL_INDEX_TYPE == "flat" or n < HNSW_MIN_VECTORS:
+            base = faiss.IndexFlatIP(dim)
+        else:
+            base = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index = faiss.IndexIDMap2(base)
+        index.add_with_ids(vectors, ids)
+        if hasattr(base, "hnsw"):
+            base.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+
+    def _write_shard(self, shard: int, index):
+        path = self._shard_path(shard)
+        tmp_path = f"{path}.tmp"
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _next_counter(self, conn: sqlite3.Connection, name: str, count: int, default: int = 0) -> int:
+        """Reserve `count` consecutive values of a catalog counter; returns the first one."""
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        first = row[0] if row else default
+        conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, int(first + count)))
+        return first
+
+    def _next_shard_id(self, conn: sqlite3.Connection) -> int:
+        default = 0
+        if conn.execute("SELECT 1 FROM counters WHERE name = 'next_shard'").fetchone() is None:
+            # Catalogs written before shards became immutable have no shard counter yet
+            names = os.listdir(os.path.join(self.directory, "shards"))
+            existing = [int(name[6:10]) for name in names if name.startswith("shard_") and name.endswith(".faiss")]
+            default = max(existing, default=-1) + 1
+        return self._next_counter(conn, "next_shard", 1, default=default)
+
+    def _shard_ids(self) -> List[int]:
+        """Shards that still hold live vectors."""
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT shard FROM segments ORDER BY shard")]
+
+    # --- writes ---
+    def add_episode(
+        self,
+        file_key: str,
+        vectors: np.ndarray,
+        segments: Optional[Sequence[Dict[str, Any]]] = None,
+        channel: Optional[str] = None,
+        title: Optional[str] = None,
+    ) -> int:
+        """
+        Add an episode's segment vectors (row i = segment i of its episode store) as a new
+        shard. `segments` (doc_id / text / start / end per row) are kept in the catalog so
+        hits resolve without opening the episode's store. Replaces the catalog entries of
+        a previous run of the same episode. Returns the shard the vectors went into.
+        """
+        vectors = np.array(vectors, dtype=np.float32, order="C", copy=True)
+        faiss.normalize_L2(vectors)
+        n = len(vectors)
+        if segments is not None and len(segments) != n:
+            raise ValueError(f"{len(segments)} segments for {n} vectors")
+
+        with self._lock:
+            conn = self._connection()
+            # Reserve the ids before touching the shard so a crash can't hand them out twice
+            first_id = self._next_counter(conn, "next_id", n)
+            shard = self._next_shard_id(conn)
+            conn.commit()
+
+        ids = np.arange(first_id, first_id + n, dtype=np.int64)
+        index = self._build_shard(vectors, ids)
+        self._write_shard(shard, index)
+
+        rows = []
+        for row, vector_id in enumerate(ids):
+            segment = segments[row] if segments is not None else {}
+            rows.append((
+                int(vector_id), file_key, row, shard,
+                segment.get("doc_id"), segment.get("text"),
+                _optional_float(segment.get("start")), _optional_float(segment.get("end")),
+            ))
+
+        with self._lock:
+            conn = self._connection()
+            previous = conn.execute("SELECT DISTINCT shard FROM segments WHERE file_key = ?", (file_key,)).fetchall()
+            conn.execute("DELETE FROM segments WHERE file_key = ?", (file_key,))
+            conn.execute("DELETE FROM episodes WHERE file_key = ?", (file_key,))
+            conn.executemany(
+                "INSERT INTO segments (id, file_key, row, shard, doc_id, text, start_s, end_s)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "INSERT INTO episodes (file_key, channel, title, shard, n_segments, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_key, channel, title, shard, n, time.time()),
+            )
+            conn.commit()
+            self._shards[shard] = index
+            # A previous run's shard may now hold nothing but stale vectors
+            for (old_shard,) in previous:
+                if conn.execute("SELECT 1 FROM segments WHERE shard = ? LIMIT 1", (old_shard,)).fetchone() is None:
+                    self._drop_shard(old_shard)
+        logger.info(f"Added {n} vectors for {file_key} to global shard {shard}")
+
+        self.compact()
+        return shard
+
+    def _merge_candidates(self, live_counts: Dict[int, int]) -> List[int]:
+        """Oldest shards of the first size tier (per dimension) holding `merge_factor` shards."""
+        tiers: Dict[tuple, List[int]] = {}
+        for shard in sorted(live_counts):
+            count = live_counts[shard]
+            index = self._shard(shard)
+            if index is None or count >= self.shard_max_vectors:
+                continue
+            tier = int(math.log(max(count, 1), self.merge_factor))
+            tiers.setdefault((tier, index.d), []).append(shard)
+
+        for _, members in sorted(tiers.items()):
+            if len(members) < self.merge_factor:
+                continue
+            group, total = [], 0
+            for shard in members:
+                if total + live_counts[shard] > self.shard_max_vectors:
+                    break
+                group.append(shard)
+                total += live_counts[shard]
+            if len(group) >= 2:
+                return group
+        return []
+
+    def compact(self):
+        """
+        Size-tiered compaction: merge similar-sized shards into one, dropping stale vectors.
+        Shards are immutable, so the merged shard is built and written without holding
+        the lock searches take; only the catalog update and the swap are locked.
+        """
+        # One compaction at a time; a running one re-checks for more work when it is done
+        if not self._compaction_lock.acquire(blocking=False):
+            return
+        try:
+            while True:
+                with self._lock:
+                    conn = self._connection()
+                    live_counts = dict(conn.execute("SELECT shard, COUNT(*) FROM segments GROUP BY shard").fetchall())
+                    group = self._merge_candidates(live_counts)
+                    if not group:
+                        return
+                    placeholders = ",".join("?" * len(group))
+                    live_ids = np.asarray(
+                        [row[0] for row in conn.execute(f"SELECT id FROM segments WHERE shard IN ({placeholders})", group)],
+                        dtype=np.int64,
+                    )
+                    indexes = [self._shard(shard) for shard in group]
+                    merged_shard = self._next_shard_id(conn)
+                    conn.commit()
+
+                vectors = np.concatenate([
+                    faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal) for index in indexes
+                ])
+                ids = np.concatenate([faiss.vector_to_array(index.id_map).astype(np.int64) for index in indexes])
+                keep = np.isin(ids, live_ids)
+                merged = None
+                if keep.any():
+                    merged = self._build_shard(np.ascontiguousarray(vectors[keep]), ids[keep])
+                    self._write_shard(merged_shard, merged)
+
+                with self._lock:
+                    conn = self._connection()
+                    conn.execute(f"UPDATE segments SET shard = ? WHERE shard IN ({placeholders})", [merged_shard, *group])
+                    conn.execute(f"UPDATE episodes SET shard = ? WHERE shard IN ({placeholders})", [merged_shard, *group])
+                    conn.commit()
+                    if merged is not None:
+                        self._shards[merged_shard] = merged
+                    for shard in group:
+                        self._drop_shard(shard)
+                    self.compactions += 1
+                logger.info(f"Merged global shards {group} into shard {merged_shard} ({int(keep.sum())} live vectors)")
+        finally:
+            self._compaction_lock.release()
+
+    # --- reads ---
+    def episode(self, file_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT file_key, channel, title, shard, n_segments FROM episodes WHERE file_key = ?", (file_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("file_key", "channel", "title", "shard", "n_segments"), row))
+
+    def version(self, channel: Optional[str] = None) -> str:
+        """Changes whenever an episode (of `channel`, or of any channel) is added or re-processed."""
+        query = "SELECT COUNT(*), MAX(added_at) FROM episodes"
+        params: tuple = ()
+        if channel is not None:
+            query += " WHERE channel = ?"
+            params = (channel,)
+        with self._lock:
+            count, newest = self._connection().execute(query, params).fetchone()
+        return f"{count}-{newest or 0:.6f}"
+
+    @staticmethod
+    def _search_allowed(index, query: np.ndarray, allowed: np.ndarray, fetch: int):
+        """
+        Search one shard restricted to `allowed` vector ids. HNSW with a selector only
+        walks the graph efSearch-wide, so a narrow filter over a big shard finds few or
+        no allowed vectors; those are scored exactly from their reconstructed vectors.
+        """
+        base = faiss.downcast_index(index.index)
+        if not hasattr(base, "hnsw") or len(allowed) > index.ntotal * GLOBAL_FILTER_EXACT_FRACTION:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed))
+            return index.search(query, fetch, params=params)
+
+        vectors = index.reconstruct_batch(allowed)
+        scores = vectors @ query[0]
+        top = min(fetch, len(allowed))
+        best = np.argpartition(-scores, top - 1)[:top] if top else np.array([], dtype=np.int64)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return scores[best].reshape(1, -1), allowed[best].reshape(1, -1)
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        k: int = 30,
+        file_keys: Optional[Sequence[str]] = None,
+        channel: Optional[str] = None,
+    ) -> List[GlobalHit]:
+        """Top-k segments across all shards, optionally restricted to some episodes and/or a channel."""
+        query = np.array(query_vector, dtype=np.float32, order="C", copy=True).reshape(1, -1)
+        faiss.normalize_L2(query)
+
+        with self._lock:
+            conn = self._connection()
+            allowed_by_shard: Optional[Dict[int, np.ndarray]] = None
+            if file_keys is not None or channel is not None:
+                clauses, params = [], []
+                if file_keys is not None:
+                    clauses.append(f"s.file_key IN ({','.join('?' * len(file_keys))})")
+                    params.extend(file_keys)
+                if channel is not None:
+                    clauses.append("e.channel = ?")
+                    params.append(channel)
+                rows = conn.execute(
+                    "SELECT s.shard, s.id FROM segments s JOIN episodes e ON e.file_key = s.file_key WHERE "
+                    + " AND ".join(clauses),
+                    params,
+                ).fetchall()
+                allowed_by_shard = {}
+                for shard, vector_id in rows:
+                    allowed_by_shard.setdefault(shard, []).append(vector_id)
+                allowed_by_shard = {
+                    shard: np.asarray(ids, dtype=np.int64) for shard, ids in allowed_by_shard.items()
+                }
+                shards = sorted(allowed_by_shard)
+            else:
+                shards = self._shard_ids()
+            # Snapshot of immutable shard objects; searched below without the lock
+            indexes = [(shard, self._shard(shard)) for shard in shards]
+
+        candidates = []
+        for shard, index in indexes:
+            if index is None or index.ntotal == 0 or index.d != query.shape[1]:
+                continue
+            fetch = min(index.ntotal, k * _STALE_OVERFETCH)
+            if allowed_by_shard is None:
+                scores, ids = index.search(query, fetch)
+            else:
+                scores, ids = self._search_allowed(index, query, allowed_by_shard[shard], fetch)
+            candidates.extend((float(s), int(i)) for s, i in zip(scores[0], ids[0]) if i != -1)
+
+        candidates.sort(reverse=True)
+        by_id = {}
+        ids = [vector_id for _, vector_id in candidates]
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                for row in conn.execute(
+                    "SELECT s.id, s.file_key, s.row, e.channel, e.title, s.doc_id, s.text, s.start_s, s.end_s "
+                    "FROM segments s JOIN episodes e ON e.file_key = s.file_key "
+                    f"WHERE s.id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ):
+                    by_id[row[0]] = row
+
+        hits = []
+        for score, vector_id in candidates:
+            row = by_id.get(vector_id)
+            if row is None:
+                continue  # stale vector from an episode that was re-processed
+            hits.append(GlobalHit(score, vector_id, *row[1:]))
+            if len(hits) == k:
+                break
+        return hits
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            episodes, = conn.execute("SELECT COUNT(*) FROM episodes").fetchone()
+            segments, = conn.execute("SELECT COUNT(*) FROM segments").fetchone()
+            return {
+                "episodes": episodes,
+                "segments": segments,
+                "shards": len(self._shard_ids()),
+                "shards_loaded": len(self._shards),
+                "compactions": self.compactions,
+            }
+
+
+GLOBAL_INDEX = GlobalIndex()
+
+
+class GlobalIndexRetriever(BaseRetriever):
+    """LangChain retriever over GLOBAL_INDEX; documents are built from the catalog."""
+
+    embeddings: Any
+    k: int = 30
+    file_keys: Optional[List[str]] = None
+    channel: Optional[str] = None
+    store_root: str = "./faiss"
+
+    def _legacy_document(self, hit: GlobalHit, segment_tables: Dict[str, Any]) -> Document:
+        """Text of a segment cataloged without it: read from the episode's segment table only."""
+        from app.services.episode_store import SEGMENTS_DIR_NAME, SegmentDocstore
+        from app.services.feature_store import FeatureStore
+
+        if hit.file_key not in segment_tables:
+            segments_dir = os.path.join(self.store_root, hit.file_key, SEGMENTS_DIR_NAME)
+            segment_tables[hit.file_key] = SegmentDocstore(FeatureStore(segments_dir))
+        return segment_tables[hit.file_key].document(hit.row)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        documents = []
+        segment_tables: Dict[str, Any] = {}
+        for hit in GLOBAL_INDEX.search(query_vector, self.k, file_keys=self.file_keys, channel=self.channel):
+            if hit.text is not None:
+                document = Document(page_content=hit.text, metadata={"id": hit.doc_id, "start": hit.start, "end": hit.end})
+            else:
+                document = self._legacy_document(hit, segment_tables)
+            document.metadata.update({
+                "file_key": hit.file_key,
+                "channel": hit.channel,
+                "title": hit.title,
+                "score": hit.score,
+            })
+            documents.append(document)
+        return documents
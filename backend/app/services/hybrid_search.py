@@ -0,0 +1,60 @@
+import os
+from typing import List, NamedTuple, Optional
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion
+
+# --- Configuration Constants ---
+# Candidates taken from each ranker before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+# A first pass counts as confident (no query rewrite needed) when the best vector hit
+# has at least this cosine similarity, or when the two rankers agree on enough of their top hits
+CONFIDENT_MIN_SIMILARITY = float(os.getenv("CONFIDENT_MIN_SIMILARITY", "0.55"))
+CONFIDENT_MIN_OVERLAP = int(os.getenv("CONFIDENT_MIN_OVERLAP", "2"))
+CONFIDENT_TOP_N = 5
+
+
+class HybridResult(NamedTuple):
+    documents: List[Document]
+    rows: List[int]
+    top_similarity: float
+    overlap: int
+
+    @property
+    def confident(self) -> bool:
+        return self.top_similarity >= CONFIDENT_MIN_SIMILARITY or self.overlap >= CONFIDENT_MIN_OVERLAP
+
+
+def hybrid_search(
+    vector_db: FAISS,
+    lexical: Optional[BM25Index],
+    embeddings,
+    query: str,
+    k: int,
+    candidates: int = HYBRID_CANDIDATES,
+) -> HybridResult:
+    """
+    Vector and BM25 retrieval over one native episode store, fused by reciprocal rank.
+    Rows are positions in the store's segment table (and FAISS index).
+    """
+    query_vector = np.asarray(embeddings.embed_query(query), dtype=np.float32).reshape(1, -1)
+    cosine = vector_db.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+    if cosine:
+        faiss.normalize_L2(query_vector)
+
+    fetch = min(max(candidates, k), vector_db.index.ntotal)
+    scores, ids = vector_db.index.search(query_vector, fetch)
+    vector_rows = [int(row) for row in ids[0] if row != -1]
+    top_similarity = float(scores[0][0]) if cosine and vector_rows else float("-inf")
+
+    lexical_rows = [row for row, _ in lexical.search(query, fetch)] if lexical is not None else []
+    overlap = len(set(vector_rows[:CONFIDENT_TOP_N]) & set(lexical_rows[:CONFIDENT_TOP_N]))
+
+    rows = [row for row, _ in reciprocal_rank_fusion([vector_rows, lexical_rows])[:k]]
+    documents = [vector_db.docstore.document(row) for row in rows]
+    return HybridResult(documents, rows, top_similarity, overlap)
@@ -0,0 +1,242 @@
+import contextvars
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import wave
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the node latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_CURRENT_TRACE: contextvars.ContextVar = contextvars.ContextVar("pipeline_trace", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process counters, gauges and histograms rendered in the Prometheus
+    text exposition format (no prometheus_client dependency).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._help: Dict[str, str] = {}
+
+    @staticmethod
+    def _key(labels: Optional[Dict[str, str]]) -> LabelKey:
+        return tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None, help: str = ""):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = self._key(labels)
+            series[key] = series.get(key, 0.0) + value
+            self._help.setdefault(name, help)
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, help: str = ""):
+        with self._lock:
+            self._gauges.setdefault(name, {})[self._key(labels)] = value
+            self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, help: str = ""):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = self._key(labels)
+            # Per-bucket counts followed by the running sum and count
+            buckets = series.setdefault(key, [0.0] * (len(LATENCY_BUCKETS) + 2))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            buckets[-2] += value
+            buckets[-1] += 1
+            self._help.setdefault(name, help)
+
+    @staticmethod
+    def _labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        items = list(key) + ([extra] if extra else [])
+        if not items:
+            return ""
+        escaped = [f'{k}="{str(v)}"'.replace("\n", " ") for k, v in items]
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(metrics.items()):
+                    if self._help.get(name):
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in series.items():
+                        lines.append(f"{name}{self._labels(key)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                if self._help.get(name):
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, buckets in series.items():
+                    for bound, count in zip(LATENCY_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{self._labels(key, ('le', str(bound)))} {count}")
+                    lines.append(f"{name}_bucket{self._labels(key, ('le', '+Inf'))} {buckets[-1]}")
+                    lines.append(f"{name}_sum{self._labels(key)} {buckets[-2]}")
+                    lines.append(f"{name}_count{self._labels(key)} {buckets[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def start_trace() -> List[Dict[str, Any]]:
+    """Begin collecting node spans for the current job/request; returns the span list."""
+    trace: List[Dict[str, Any]] = []
+    _CURRENT_TRACE.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[List[Dict[str, Any]]]:
+    return _CURRENT_TRACE.get()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    if resource is None:
+        try:
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except AttributeError:
+            return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def process_cpu_seconds() -> float:
+    """
+    User + system CPU time of the whole process: every thread (CTranslate2 / torch
+    intra-op pools included) plus child processes (the transcription pool, loky
+    workers). Live children are only visible through psutil; without it only
+    children that have already exited are counted.
+    """
+    if psutil is not None:
+        process = psutil.Process()
+        times = process.cpu_times()
+        total = times.user + times.system + getattr(times, "children_user", 0.0) + getattr(times, "children_system", 0.0)
+        for child in process.children(recursive=True):
+            try:
+                child_times = child.cpu_times()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            total += child_times.user + child_times.system
+        return total
+    if resource is not None:
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    return time.process_time()
+
+
+def _audio_seconds(path: Optional[str]) -> Optional[float]:
+    if not path or not path.endswith(".wav") or not os.path.exists(path):
+        return None
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def _field(state: Any, name: str):
+    if isinstance(state, dict):
+        return state.get(name)
+    return getattr(state, name, None)
+
+
+def input_sizes(state: Any) -> Dict[str, Any]:
+    """Size of the work a node was handed: audio seconds, segment count and transcript tokens."""
+    sizes: Dict[str, Any] = {}
+    audio_seconds = _audio_seconds(_field(state, "wav_file_path") or _field(state, "audio_file_path"))
+    if audio_seconds is not None:
+        sizes["audio_seconds"] = round(audio_seconds, 3)
+    segments = _field(state, "formatted_transcript_segments")
+    if segments is not None:
+        sizes["segments"] = len(segments)
+    transcript = _field(state, "transcript")
+    if transcript:
+        # Whitespace tokens; cheap and stable enough to compare runs
+        sizes["tokens"] = len(transcript.split())
+    return sizes
+
+
+def instrument_node(name: str, fn: Callable) -> Callable:
+    """
+    Wrap a LangGraph node so every call records wall time, process CPU time,
+    peak RSS and input sizes into METRICS and the current trace.
+
+    CPU time and peak RSS are process-wide: while several jobs run at once, a node's
+    figures include whatever the other jobs did during the same interval.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(state, *args, **kwargs):
+        sizes = input_sizes(state)
+        wall_start = time.perf_counter()
+        cpu_start = process_cpu_seconds()
+        rss_before = peak_rss_mb()
+        status = "ok"
+        try:
+            return fn(state, *args, **kwargs)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            wall_s = time.perf_counter() - wall_start
+            cpu_s = process_cpu_seconds() - cpu_start
+            rss_after = peak_rss_mb()
+            labels = {"node": name, "status": status}
+
+            METRICS.observe("pipeline_node_duration_seconds", wall_s, labels, "Wall time per pipeline node")
+            METRICS.inc(
+                "pipeline_node_process_cpu_seconds_total", cpu_s, {"node": name},
+                "Process-wide CPU time (threads and child processes) while each node ran; shared by concurrent jobs",
+            )
+            METRICS.inc("pipeline_node_calls_total", 1, labels, "Pipeline node invocations")
+            METRICS.set("process_peak_rss_megabytes", rss_after, help="Peak resident set size of the API process")
+            for size_name, value in sizes.items():
+                METRICS.inc(f"pipeline_node_input_{size_name}_total", value, {"node": name}, f"Input {size_name} seen per node")
+
+            span = {
+                "node": name,
+                "status": status,
+                "started_at": time.time() - wall_s,
+                "wall_s": round(wall_s, 4),
+                "process_cpu_s": round(cpu_s, 4),
+                "process_peak_rss_mb": round(rss_after, 1),
+                # Growth of the process-lifetime peak: 0 unless this node set a new high-water mark
+                "process_peak_rss_increase_mb": round(rss_after - rss_before, 1),
+                "inputs": sizes,
+            }
+            trace = current_trace()
+            if trace is not None:
+                trace.append(span)
+            logger.info(f"node={name} status={status} wall_s={wall_s:.2f} process_cpu_s={cpu_s:.2f} peak_rss_mb={rss_after:.0f} inputs={sizes}")
+
+    return wrapper
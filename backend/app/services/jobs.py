@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.instrumentation import start_trace
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Pipelines running at the same time
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs allowed to wait for a worker before new submissions are rejected
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "16"))
+# Finished jobs kept around for polling
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+_CURRENT_JOB: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.events: List[Dict[str, Any]] = []
+        self.trace: List[Dict[str, Any]] = []
+        self._events_changed = threading.Condition(threading.RLock())
+        # (loop, event) of async streamers waiting in `next_events`
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def emit(self, event: str, **data):
+        """Append a progress event and wake up anyone streaming this job."""
+        with self._events_changed:
+            self.events.append({
+                "seq": len(self.events),
+                "event": event,
+                "time": time.time(),
+                **data,
+            })
+            self._events_changed.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # The streamer's event loop has shut down
+                pass
+
+    def finish(self, status: str, **data):
+        """Record the terminal status together with the final event, atomically for streamers."""
+        with self._events_changed:
+            self.finished_at = time.time()
+            self.status = status
+            self.emit("job_finished", status=status, **data)
+
+    def wait_for_events(self, after: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        """Events with seq >= `after` (waiting up to `timeout` for one), and whether the job is done."""
+        with self._events_changed:
+            if len(self.events) <= after and not self.done:
+                self._events_changed.wait(timeout)
+            return self.events[after:], self.done
+
+    async def next_events(self, after: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Async `wait_for_events`: waits on the caller's event loop, woken by `emit`, so a
+        streaming client doesn't hold a worker thread for the lifetime of the job.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._events_changed:
+            if len(self.events) > after or self.done:
+                return self.events[after:], self.done
+            self._async_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._events_changed:
+                self._async_waiters.remove(waiter)
+        with self._events_changed:
+            return self.events[after:], self.done
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs blocking pipeline work on a bounded thread pool so request handlers can
+    return a job ID immediately and clients poll for the result.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED, history: int = JOB_HISTORY):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue `fn(*args, **kwargs)`. Raises JobQueueFull when too many jobs are waiting."""
+        job = Job(kind)
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if not j.done)
+            if pending >= self.workers + self.max_queued:
+                raise JobQueueFull(f"{pending} jobs already pending")
+            self._jobs[job.id] = job
+            self._prune()
+
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts["workers"] = self.workers
+        return counts
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        token = _CURRENT_JOB.set(job)
+        # Instrumented graph nodes append their spans to this list
+        job.trace = start_trace()
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.emit("job_started")
+        try:
+            result = fn(*args, **kwargs)
+            job.result = result
+            job.finish(SUCCEEDED, result=result)
+            return result
+        except Exception as e:
+            job.error = str(e)
+            logger.error(f"Job {job.id} failed: {e}\n{traceback.format_exc()}")
+            job.finish(FAILED, error=job.error)
+            raise
+        finally:
+            _CURRENT_JOB.reset(token)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+
+def current_job() -> Optional[Job]:
+    """The job whose worker thread is calling, if any."""
+    return _CURRENT_JOB.get()
+
+
+def emit_job_event(event: str, **data):
+    """Publish a progress event for the current job; a no-op outside of a job."""
+    job = current_job()
+    if job is not None:
+        job.emit(event, **data)
+
+
+JOB_MANAGER = JobManager()
@@ -0,0 +1,141 @@
+"""
+BM25 inverted index over an episode's segments, saved next to its vector index,
+plus reciprocal-rank fusion for hybrid lexical + vector retrieval.
+
+Postings are stored CSR-style (term_offsets / doc_ids / term_freqs .npy arrays) and
+memory-mapped on load, so a query touches only the postings of its own terms.
+"""
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Constant in 1 / (k + rank); 60 is the value from the original RRF paper
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+LEXICAL_INDEX_VERSION = 1
+
+# Keeps numbers, versions and hyphenated names ("3.5", "gpt-4", "o'brien") as single tokens
+_TOKEN_RE = re.compile(r"[^\W_]+(?:['.\-][^\W_]+)*")
+_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you your
+yours yourself yourselves
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        term_offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ):
+        self.vocabulary = vocabulary
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_lengths)
+        self.avg_doc_length = float(doc_lengths.mean()) if self.n_docs else 0.0
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        postings: List[List[Tuple[int, int]]] = []
+        doc_lengths = []
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc, freq))
+
+        term_offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum([len(plist) for plist in postings], out=term_offsets[1:])
+        doc_ids = np.fromiter((doc for plist in postings for doc, _ in plist), dtype=np.int32, count=int(term_offsets[-1]))
+        term_freqs = np.fromiter((freq for plist in postings for _, freq in plist), dtype=np.float32, count=int(term_offsets[-1]))
+        return cls(vocabulary, term_offsets, doc_ids, term_freqs, np.asarray(doc_lengths, dtype=np.float32))
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (doc row, BM25 score) for a free-text query; empty when no query term is indexed."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_doc_length, 1e-9))
+        matched = False
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            matched = True
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            freqs = self.term_freqs[start:end]
+            df = end - start
+            idf = np.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + length_norm[docs])
+        if not matched:
+            return []
+
+        k = min(k, int(np.count_nonzero(scores)))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.array([], dtype=np.int64)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(doc), float(scores[doc])) for doc in top]
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "term_offsets.npy"), self.term_offsets)
+        np.save(os.path.join(directory, "doc_ids.npy"), self.doc_ids)
+        np.save(os.path.join(directory, "term_freqs.npy"), self.term_freqs)
+        np.save(os.path.join(directory, "doc_lengths.npy"), self.doc_lengths)
+        with open(os.path.join(directory, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": LEXICAL_INDEX_VERSION, "k1": self.k1, "b": self.b, "terms": self.vocabulary}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index":
+        with open(os.path.join(directory, "vocabulary.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != LEXICAL_INDEX_VERSION:
+            raise ValueError(f"Unsupported lexical index version {meta.get('version')} in {directory}")
+
+        def array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        return cls(
+            meta["terms"],
+            array("term_offsets"),
+            array("doc_ids"),
+            array("term_freqs"),
+            np.asarray(array("doc_lengths")),
+            k1=meta["k1"],
+            b=meta["b"],
+        )
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Fuse ranked lists of row ids: score(row) = sum over lists of 1 / (k + rank), best first."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
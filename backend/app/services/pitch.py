@@ -0,0 +1,185 @@
+"""
+Pluggable pitch (f0) estimation for the audio analysis stage.
+
+Backends, from most accurate / slowest to fastest:
+    pyin      probabilistic YIN with Viterbi voicing (librosa.pyin)
+    yin       librosa.yin with an energy-based voicing gate
+    autocorr  vectorised FFT autocorrelation over all frames
+    none      skip pitch entirely (mean_pitch / pitch_std become 0)
+
+Run `python -m app.services.pitch some_episode.wav` from backend/ to benchmark every
+backend against pyin on a given file.
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Tuple
+
+import librosa
+import numpy as np
+
+PITCH_BACKENDS = ("pyin", "yin", "autocorr", "none")
+PITCH_BACKEND = os.getenv("PITCH_BACKEND", "pyin").lower()
+
+# Frames quieter than this many dB below the loudest frame are treated as unvoiced
+VOICING_TOP_DB = 40.0
+# Minimum normalised autocorrelation peak for a frame to count as voiced
+AUTOCORR_VOICING_THRESHOLD = 0.45
+# Frames processed per vectorised autocorrelation block (bounds peak memory)
+AUTOCORR_BLOCK_FRAMES = 4096
+
+
+def _energy_gate(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
+    rms_db = librosa.amplitude_to_db(rms + np.finfo(np.float32).eps, ref=np.max)
+    return rms_db > -VOICING_TOP_DB
+
+
+def _pyin(y, sr, frame_length, hop_length, fmin, fmax):
+    f0, voiced_flag, _ = librosa.pyin(
+        y, fmin=fmin, fmax=fmax, sr=sr, frame_length=frame_length, hop_length=hop_length
+    )
+    return f0, voiced_flag
+
+
+def _yin(y, sr, frame_length, hop_length, fmin, fmax):
+    f0 = librosa.yin(y, fmin=fmin, fmax=fmax, sr=sr, frame_length=frame_length, hop_length=hop_length)
+    voiced = _energy_gate(y, frame_length, hop_length)[: len(f0)]
+    # yin reports the search limits when it finds no clear period
+    voiced &= (f0 > fmin * 1.01) & (f0 < fmax * 0.99)
+    return np.where(voiced, f0, np.nan), voiced
+
+
+def _autocorr(y, sr, frame_length, hop_length, fmin, fmax):
+    min_lag = max(1, int(np.floor(sr / fmax)))
+    max_lag = min(frame_length - 2, int(np.ceil(sr / fmin)))
+    n_fft = 1 << int(np.ceil(np.log2(2 * frame_length)))
+    window = np.hanning(frame_length).astype(np.float32)
+
+    # Centre frames like librosa (frame t is centred on sample t * hop_length)
+    padded = np.pad(np.asarray(y, dtype=np.float32), frame_length // 2)
+    frames = librosa.util.frame(padded, frame_length=frame_length, hop_length=hop_length)
+    n_frames = frames.shape[1]
+
+    f0 = np.full(n_frames, np.nan, dtype=np.float64)
+    voiced = np.zeros(n_frames, dtype=bool)
+    for start in range(0, n_frames, AUTOCORR_BLOCK_FRAMES):
+        block = frames[:, start:start + AUTOCORR_BLOCK_FRAMES] * window[:, None]
+        block = block - block.mean(axis=0, keepdims=True)
+        spectrum = np.fft.rfft(block, n=n_fft, axis=0)
+        acf = np.fft.irfft(np.abs(spectrum) ** 2, n=n_fft, axis=0)[: max_lag + 2]
+        energy = acf[0]
+        acf = acf / np.where(energy > 0, energy, 1.0)
+
+        search = acf[min_lag:max_lag + 1]
+        best = np.argmax(search, axis=0)
+        peak = search[best, np.arange(search.shape[1])]
+        lag = best + min_lag
+
+        # Parabolic interpolation around the peak for sub-sample lag precision
+        left = acf[lag - 1, np.arange(len(lag))]
+        right = acf[lag + 1, np.arange(len(lag))]
+        denom = left - 2 * peak + right
+        offset = np.where(np.abs(denom) > 1e-12, 0.5 * (left - right) / denom, 0.0)
+        refined_lag = lag + np.clip(offset, -0.5, 0.5)
+
+        block_voiced = (peak >= AUTOCORR_VOICING_THRESHOLD) & (energy > 0)
+        f0[start:start + len(lag)] = np.where(block_voiced, sr / refined_lag, np.nan)
+        voiced[start:start + len(lag)] = block_voiced
+
+    voiced &= _energy_gate(y, frame_length, hop_length)[:n_frames]
+    f0[~voiced] = np.nan
+    return f0, voiced
+
+
+def _none(y, sr, frame_length, hop_length, fmin, fmax):
+    n_frames = 1 + len(y) // hop_length
+    return np.full(n_frames, np.nan), np.zeros(n_frames, dtype=bool)
+
+
+_ESTIMATORS = {
+    "pyin": _pyin,
+    "yin": _yin,
+    "autocorr": _autocorr,
+    "none": _none,
+}
+
+
+def estimate_pitch(
+    y: np.ndarray,
+    sr: int,
+    backend: str = PITCH_BACKEND,
+    frame_length: int = 2048,
+    hop_length: int = 512,
+    fmin: float = librosa.note_to_hz('C2'),
+    fmax: float = librosa.note_to_hz('C5'),
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return per-frame (f0 in Hz with NaN when unvoiced, voiced flag)."""
+    if backend not in _ESTIMATORS:
+        raise ValueError(f"Unknown pitch backend '{backend}', expected one of {PITCH_BACKENDS}")
+    return _ESTIMATORS[backend](y, sr, frame_length, hop_length, fmin, fmax)
+
+
+def compare_to_reference(f0: np.ndarray, voiced: np.ndarray, ref_f0: np.ndarray, ref_voiced: np.ndarray) -> Dict[str, float]:
+    """Voicing agreement, gross pitch error (>20% off) and median cents error against a reference track."""
+    n = min(len(f0), len(ref_f0))
+    f0, voiced, ref_f0, ref_voiced = f0[:n], voiced[:n], ref_f0[:n], ref_voiced[:n]
+    both = voiced & ref_voiced & ~np.isnan(f0) & ~np.isnan(ref_f0)
+
+    metrics = {"voicing_agreement": float(np.mean(voiced == ref_voiced)) if n else float("nan")}
+    if both.any():
+        ratio = f0[both] / ref_f0[both]
+        metrics["gross_pitch_error"] = float(np.mean(np.abs(ratio - 1.0) > 0.2))
+        metrics["median_cents_error"] = float(np.median(np.abs(1200 * np.log2(ratio))))
+    else:
+        metrics["gross_pitch_error"] = float("nan")
+        metrics["median_cents_error"] = float("nan")
+    return metrics
+
+
+def benchmark_pitch_backends(y: np.ndarray, sr: int, backends: List[str] = PITCH_BACKENDS) -> List[Dict[str, float]]:
+    """Time every backend on the same signal and score it against pyin."""
+    duration_s = len(y) / float(sr)
+    runs = {}
+    for backend in backends:
+        start = time.perf_counter()
+        f0, voiced = estimate_pitch(y, sr, backend)
+        runs[backend] = (time.perf_counter() - start, f0, voiced)
+
+    if "pyin" in runs:
+        ref_f0, ref_voiced = runs["pyin"][1], runs["pyin"][2]
+    else:
+        ref_f0, ref_voiced = estimate_pitch(y, sr, "pyin")
+
+    results = []
+    for backend, (seconds, f0, voiced) in runs.items():
+        row = {
+            "backend": backend,
+            "seconds": seconds,
+            "realtime_factor": duration_s / seconds if seconds > 0 else float("inf"),
+            "mean_pitch": float(np.nanmean(f0)) if np.any(voiced) else 0.0,
+        }
+        row.update(compare_to_reference(f0, voiced, ref_f0, ref_voiced))
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    from app.services.audio_io import load_audio
+
+    parser = argparse.ArgumentParser(description="Benchmark pitch backends against pyin")
+    parser.add_argument("audio_path")
+    parser.add_argument("--sr", type=int, default=16000)
+    parser.add_argument("--seconds", type=float, default=300.0, help="Only use the first N seconds (0 = whole file)")
+    args = parser.parse_args()
+
+    signal, rate = load_audio(args.audio_path, sr=args.sr)
+    if args.seconds > 0:
+        signal = signal[: int(args.seconds * rate)]
+
+    print(f"{'backend':<10}{'seconds':>10}{'x realtime':>12}{'voicing':>10}{'GPE':>8}{'cents':>8}")
+    for row in benchmark_pitch_backends(signal, rate):
+        print(
+            f"{row['backend']:<10}{row['seconds']:>10.2f}{row['realtime_factor']:>12.1f}"
+            f"{row['voicing_agreement']:>10.3f}{row['gross_pitch_error']:>8.3f}{row['median_cents_error']:>8.1f}"
+        )
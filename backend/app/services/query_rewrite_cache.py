@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.services.disk_cache import atomic_write_json, enforce_size_limit, entry_size, touch
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+QUERY_REWRITE_CACHE_DIR = os.getenv("QUERY_REWRITE_CACHE_DIR", "query_rewrite_cache")
+QUERY_REWRITE_CACHE_MAX_MB = int(os.getenv("QUERY_REWRITE_CACHE_MAX_MB", "16"))
+QUERY_REWRITE_MEMORY_ENTRIES = int(os.getenv("QUERY_REWRITE_MEMORY_ENTRIES", "2048"))
+
+# When over the cap, evict down to this fraction of it so eviction doesn't run on every put
+_EVICT_TO_FRACTION = 0.9
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class QueryRewriteCache:
+    """
+    question -> optimized search query, keyed by (rewrite model, normalized question).
+    An in-memory LRU in front of one small JSON file per entry on disk, so rewrites
+    survive restarts; the disk side is bounded by size with LRU eviction. Its size is
+    tracked approximately in memory, so the directory is only scanned when the cap is crossed.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = QUERY_REWRITE_CACHE_DIR,
+        max_mb: int = QUERY_REWRITE_CACHE_MAX_MB,
+        memory_entries: int = QUERY_REWRITE_MEMORY_ENTRIES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self.memory_entries = max(1, memory_entries)
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Approximate bytes on disk; None until the first put measures the directory
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, question: str) -> str:
+        return hashlib.sha256(f"{model}\n{normalize_question(question)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key: str, query: str):
+        self._memory[key] = query
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, model: str, question: str) -> Optional[str]:
+        key = self.key(model, question)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                query = json.load(f)["query"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        touch(path)
+        with self._lock:
+            self._remember(key, query)
+            self.hits += 1
+        return query
+
+    def put(self, model: str, question: str, query: str):
+        key = self.key(model, question)
+        path = self._path(key)
+        if self._disk_bytes is None:
+            self._disk_bytes = entry_size(self.cache_dir)
+        atomic_write_json(path, {"model": model, "question": question, "query": query})
+        written = entry_size(path)
+        with self._lock:
+            self._remember(key, query)
+            self._disk_bytes += written
+            over_cap = self._disk_bytes > self.max_bytes
+        if over_cap:
+            # Directory scan and eviction outside the lock so lookups aren't stalled
+            enforce_size_limit(self.cache_dir, int(self.max_bytes * _EVICT_TO_FRACTION))
+            remaining = entry_size(self.cache_dir)
+            with self._lock:
+                self._disk_bytes = remaining
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
+
+
+QUERY_REWRITE_CACHE = QueryRewriteCache()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class SharedAudioHandle(NamedTuple):
+    """Picklable reference to a decoded signal; a few bytes instead of the samples."""
+    path: str
+    length: int
+    dtype: str
+
+    def open(self) -> np.ndarray:
+        """Read-only, zero-copy view of the signal (pages are shared through the OS cache)."""
+        global _ATTACHED
+        # Read the global once: with an in-process joblib backend, other jobs' threads
+        # replace or clear it concurrently
+        attached = _ATTACHED
+        if attached is None or attached[0] != self.path:
+            attached = (self.path, np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self.length,)))
+            _ATTACHED = attached
+        return attached[1]
+
+
+# The buffer a worker process attached to last. Workers handle many tasks for the
+# same file, so this avoids re-mapping per sentence while holding only one file open.
+_ATTACHED: Optional[tuple] = None
+
+
+class SharedAudioBuffer:
+    """
+    Writes a decoded signal once to a memory-mapped file that joblib workers
+    attach to by path and slice by sample index, instead of receiving a pickled copy.
+
+        with SharedAudioBuffer(y) as handle:
+            Parallel(n_jobs)(delayed(work)(handle, ...) for ...)
+    """
+
+    def __init__(self, y: np.ndarray, dtype: Optional[str] = None, directory: Optional[str] = None):
+        fd, self.path = tempfile.mkstemp(prefix="shared_audio_", suffix=".pcm", dir=directory)
+        os.close(fd)
+        samples = np.asarray(y, dtype=dtype)
+        dtype = samples.dtype.name
+        buffer = np.memmap(self.path, dtype=dtype, mode="w+", shape=samples.shape)
+        buffer[:] = samples
+        buffer.flush()
+        del buffer
+        self.handle = SharedAudioHandle(self.path, int(samples.shape[0]), dtype)
+
+    def __enter__(self) -> SharedAudioHandle:
+        return self.handle
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        global _ATTACHED
+        if _ATTACHED is not None and _ATTACHED[0] == self.path:
+            _ATTACHED = None
+        try:
+            os.remove(self.path)
+        except (FileNotFoundError, PermissionError):
+            # On Windows a worker may still hold the mapping; the temp dir is cleaned eventually
+            pass
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import wave
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.disk_cache import atomic_write_json, enforce_size_limit, touch
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", "transcripts_cache")
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512"))
+
+_HASH_CHUNK_FRAMES = 1 << 20
+
+
+def audio_content_hash(wav_path: str) -> str:
+    """
+    SHA-256 of the decoded PCM in a (normalized 16 kHz mono) WAV file.
+    Only the sample data and format are hashed, so re-encoding the same audio
+    with different container metadata still maps to the same entry.
+    """
+    digest = hashlib.sha256()
+    with wave.open(wav_path, "rb") as wf:
+        digest.update(f"{wf.getframerate()}:{wf.getnchannels()}:{wf.getsampwidth()}".encode())
+        while True:
+            frames = wf.readframes(_HASH_CHUNK_FRAMES)
+            if not frames:
+                break
+            digest.update(frames)
+    return digest.hexdigest()
+
+
+def transcript_cache_key(audio_hash: str, config: Dict[str, Any]) -> str:
+    """Combine the audio hash with everything that influences the transcript."""
+    payload = json.dumps({"audio": audio_hash, "config": config}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranscriptCache:
+    """
+    On-disk transcript cache: one JSON entry per cache key holding the full text
+    and the formatted segments. Bounded by total size with LRU eviction.
+    """
+
+    def __init__(self, cache_dir: str = TRANSCRIPT_CACHE_DIR, max_mb: int = TRANSCRIPT_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Tuple[str, List[dict]]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        touch(path)
+        with self._lock:
+            self.hits += 1
+        return entry["text"], entry["segments"]
+
+    def put(self, key: str, text: str, segments: List[dict], config: Optional[Dict[str, Any]] = None):
+        atomic_write_json(self._path(key), {
+            "text": text,
+            "segments": segments,
+            "config": config or {},
+        })
+        with self._lock:
+            enforce_size_limit(self.cache_dir, self.max_bytes)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+TRANSCRIPT_CACHE = TranscriptCache()
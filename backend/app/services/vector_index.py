@@ -0,0 +1,130 @@
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# auto | flat | hnsw | ivfpq
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "auto").lower()
+# "auto" switches flat -> hnsw -> ivfpq at these vector counts
+HNSW_MIN_VECTORS = int(os.getenv("HNSW_MIN_VECTORS", "20000"))
+IVFPQ_MIN_VECTORS = int(os.getenv("IVFPQ_MIN_VECTORS", "200000"))
+
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "128"))
+
+IVFPQ_NPROBE = int(os.getenv("IVFPQ_NPROBE", "16"))
+IVFPQ_BITS = 8
+# faiss wants roughly this many training points per IVF list
+IVF_TRAIN_POINTS_PER_LIST = 39
+
+INDEX_META_NAME = "index_meta.json"
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def choose_index_type(n_vectors: int, requested: str = VECTOR_INDEX_TYPE) -> str:
+    if requested in INDEX_TYPES:
+        return requested
+    if requested != "auto":
+        logger.warning(f"Unknown VECTOR_INDEX_TYPE '{requested}', using auto")
+    if n_vectors >= IVFPQ_MIN_VECTORS:
+        return "ivfpq"
+    if n_vectors >= HNSW_MIN_VECTORS:
+        return "hnsw"
+    return "flat"
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest divisor of `dim` giving sub-vectors of at least 8 dims (96 for 768-d mpnet)."""
+    for m in (96, 64, 48, 32, 24, 16, 8, 4, 2, 1):
+        if dim % m == 0 and dim // m >= 8:
+            return m
+    return 1
+
+
+def build_index(vectors: np.ndarray, index_type: str = VECTOR_INDEX_TYPE) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Build an inner-product index over L2-normalized copies of `vectors` (cosine
+    similarity). Returns the populated index and the metadata saved next to it.
+    """
+    vectors = np.array(vectors, dtype=np.float32, order="C", copy=True)
+    faiss.normalize_L2(vectors)
+    n, dim = vectors.shape
+    chosen = choose_index_type(n, index_type)
+    params: Dict[str, Any] = {}
+
+    if chosen == "ivfpq":
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // IVF_TRAIN_POINTS_PER_LIST))
+        if n < max(1 << IVFPQ_BITS, IVF_TRAIN_POINTS_PER_LIST * nlist):
+            logger.info(f"Only {n} vectors, too few to train IVF-PQ; using HNSW")
+            chosen = "hnsw"
+        else:
+            m = _pq_subquantizers(dim)
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, IVFPQ_BITS, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = min(IVFPQ_NPROBE, nlist)
+            params = {"nlist": nlist, "m": m, "bits": IVFPQ_BITS, "nprobe": index.nprobe}
+
+    if chosen == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        params = {"M": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION, "ef_search": HNSW_EF_SEARCH}
+    elif chosen == "flat":
+        index = faiss.IndexFlatIP(dim)
+
+    index.add(vectors)
+    meta = {
+        "index_type": chosen,
+        "metric": "inner_product",
+        "normalize_L2": True,
+        "dim": dim,
+        "count": n,
+        "params": params,
+    }
+    return index, meta
+
+
+def save_index_meta(directory: str, meta: Dict[str, Any]):
+    with open(os.path.join(directory, INDEX_META_NAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_index_meta(directory: str) -> Optional[Dict[str, Any]]:
+    """Metadata of a store built by `build_index`, or None for stores that predate it (flat L2)."""
+    try:
+        with open(os.path.join(directory, INDEX_META_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def configure_search(index, meta: Optional[Dict[str, Any]]):
+    """Apply the current search-time knobs (efSearch / nprobe), which may differ from build time."""
+    if not meta:
+        return
+    if meta.get("index_type") == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = HNSW_EF_SEARCH
+    elif meta.get("index_type") == "ivfpq":
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(IVFPQ_NPROBE, ivf.nlist)
+
+
+def langchain_store_kwargs(meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """FAISS vector store settings matching how the index was built."""
+    if meta and meta.get("metric") == "inner_product":
+        return {
+            "normalize_L2": bool(meta.get("normalize_L2", True)),
+            "distance_strategy": DistanceStrategy.MAX_INNER_PRODUCT,
+        }
+    return {"distance_strategy": DistanceStrategy.EUCLIDEAN_DISTANCE}
+
@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Upper bound on the (estimated) memory held by cached stores
+VECTOR_STORE_CACHE_MAX_MB = int(os.getenv("VECTOR_STORE_CACHE_MAX_MB", "1024"))
+VECTOR_STORE_CACHE_MAX_ENTRIES = int(os.getenv("VECTOR_STORE_CACHE_MAX_ENTRIES", "32"))
+
+
+class _Entry(NamedTuple):
+    store: Any
+    version: Tuple[float, int]
+    size_bytes: int
+
+
+def store_version(directory: str) -> Tuple[Tuple[float, int], int]:
+    """
+    ((newest mtime, file count), total bytes) of the files in a store directory,
+    including subdirectories (segments/, bm25/). A rebuilt store changes the version;
+    the on-disk size doubles as the memory estimate.
+    """
+    newest = 0.0
+    count = 0
+    size = 0
+    pending = [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    newest = max(newest, stat.st_mtime)
+                    count += 1
+                    size += stat.st_size
+    return (newest, count), size
+
+
+class VectorStoreCache:
+    """
+    Process-wide LRU cache of loaded episode vector stores, keyed by directory.
+
+    Each hit re-stats the directory, and a store rebuilt on disk since it was loaded is
+    reloaded. Least-recently-used stores are evicted once the summed on-disk size of
+    the cached stores exceeds `max_mb` or more than `max_entries` are held.
+    """
+
+    def __init__(self, max_mb: int = VECTOR_STORE_CACHE_MAX_MB, max_entries: int = VECTOR_STORE_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_entries = max(1, max_entries)
+        self._stores: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.size_bytes = 0
+        self.loads = 0
+        self.hits = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _lookup(self, key: str, version) -> Any:
+        entry = self._stores.get(key)
+        if entry is None:
+            return None
+        if entry.version != version:
+            self._drop(key)
+            self.invalidations += 1
+            logger.info(f"Vector store {key} changed on disk, reloading")
+            return None
+        self._stores.move_to_end(key)
+        self.hits += 1
+        return entry.store
+
+    def get(self, directory: str, loader: Callable[[str], Any]) -> Any:
+        """Return the loaded store for `directory`, calling `loader(directory)` on a miss."""
+        key = os.path.normpath(directory)
+        version, size = store_version(key)
+
+        with self._lock:
+            store = self._lookup(key, version)
+            if store is not None:
+                return store
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests for the same episode wait for a single load
+        with key_lock:
+            with self._lock:
+                store = self._lookup(key, version)
+                if store is not None:
+                    return store
+
+            store = loader(directory)
+
+            with self._lock:
+                self._drop(key)
+                self._stores[key] = _Entry(store, version, size)
+                self.size_bytes += size
+                self.loads += 1
+                while len(self._stores) > 1 and (
+                    len(self._stores) > self.max_entries or self.size_bytes > self.max_bytes
+                ):
+                    self._evict_oldest()
+            return store
+
+    def invalidate(self, directory: str) -> bool:
+        with self._lock:
+            return self._drop(os.path.normpath(directory))
+
+    def _drop(self, key: str) -> bool:
+        entry = self._stores.pop(key, None)
+        if entry is None:
+            return False
+        self.size_bytes -= entry.size_bytes
+        return True
+
+    def _evict_oldest(self):
+        key, entry = self._stores.popitem(last=False)
+        self.size_bytes -= entry.size_bytes
+        self.evictions += 1
+        logger.info(f"Evicted vector store {key}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loads": self.loads,
+                "hits": self.hits,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "entries": len(self._stores),
+                "size_mb": round(self.size_bytes / (1024 * 1024), 1),
+                "max_mb": self.max_bytes // (1024 * 1024),
+            }
+
+
+VECTOR_STORE_CACHE = VectorStoreCache()
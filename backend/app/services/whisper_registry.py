@@ -0,0 +1,170 @@
+import gc
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from app.services.device import transcription_model_kwargs
+
+import whisper_s2t
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+WHISPER_MODEL_IDENTIFIER = os.getenv("WHISPER_MODEL_IDENTIFIER", "small")
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "CTranslate2")
+# Number of distinct model configurations kept warm at the same time
+WHISPER_MAX_MODELS = int(os.getenv("WHISPER_MAX_MODELS", "2"))
+# Before loading a new model, drop idle ones if less than this much RAM is available
+WHISPER_MIN_AVAILABLE_MB = int(os.getenv("WHISPER_MIN_AVAILABLE_MB", "1024"))
+
+ModelKey = Tuple[str, str, str, str]
+
+
+class WhisperModelRegistry:
+    """
+    Process-wide cache of loaded whisper_s2t models.
+
+    Models are loaded lazily on first use and kept warm between graph invocations.
+    Entries are keyed by (model id, backend, compute_type, device) and evicted in
+    least-recently-used order once more than `max_models` configurations are loaded,
+    or explicitly through `evict` / `release` when the process is under memory pressure.
+    """
+
+    def __init__(self, max_models: int = WHISPER_MAX_MODELS):
+        self.max_models = max(1, max_models)
+        self._models: "OrderedDict[ModelKey, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        model_identifier: str,
+        backend: str,
+        compute_type: str,
+        device: str,
+        **model_kwargs,
+    ):
+        """Return a warm model for the given configuration, loading it if necessary."""
+        key: ModelKey = (model_identifier, backend, compute_type, device)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other configurations stay available,
+        # but make concurrent requests for the same key wait for a single load.
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self.hits += 1
+                    return self._models[key]
+
+            if _available_memory_mb() < WHISPER_MIN_AVAILABLE_MB:
+                logger.warning("Low available memory, releasing idle whisper models before loading.")
+                self.release(keep=0)
+
+            logger.info(f"Loading whisper model {key}")
+            model = whisper_s2t.load_model(
+                model_identifier=model_identifier,
+                backend=backend,
+                compute_type=compute_type,
+                device=device,
+                **model_kwargs,
+            )
+
+            with self._lock:
+                self._models[key] = model
+                self.loads += 1
+                while len(self._models) > self.max_models:
+                    self._evict_oldest()
+            return model
+
+    def evict(self, key: ModelKey) -> bool:
+        """Drop a single model configuration. Returns True if it was loaded."""
+        with self._lock:
+            model = self._models.pop(key, None)
+            if model is None:
+                return False
+            self.evictions += 1
+        del model
+        self._collect()
+        return True
+
+    def release(self, keep: int = 0) -> int:
+        """
+        Evict least-recently-used models until at most `keep` remain.
+        Intended to be called when the host is running low on memory.
+        """
+        released = 0
+        with self._lock:
+            while len(self._models) > max(0, keep):
+                self._evict_oldest()
+                released += 1
+        if released:
+            self._collect()
+        return released
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "loaded": [list(key) for key in self._models],
+            }
+
+    def _evict_oldest(self):
+        key, _ = self._models.popitem(last=False)
+        self.evictions += 1
+        logger.info(f"Evicted whisper model {key}")
+
+    @staticmethod
+    def _collect():
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+def _available_memory_mb() -> float:
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return float("inf")
+
+
+WHISPER_MODEL_REGISTRY = WhisperModelRegistry()
+
+
+def get_whisper_model(
+    model_identifier: str = WHISPER_MODEL_IDENTIFIER,
+    backend: str = WHISPER_BACKEND,
+    workers: int = 1,
+    **overrides,
+):
+    """
+    Fetch a warm model for this host. Device, compute type and CPU threads come from
+    app/services/device.py unless explicitly overridden.
+    """
+    model_kwargs = transcription_model_kwargs(workers)
+    model_kwargs.update(overrides)
+    compute_type = model_kwargs.pop("compute_type")
+    device = model_kwargs.pop("device")
+    return WHISPER_MODEL_REGISTRY.get(model_identifier, backend, compute_type, device, **model_kwargs)